@@ -7,34 +7,110 @@ from quantfin.instruments.ois_swap import OISSwap
 
 
 class MultiCurveBootstrapper:
+    """
+    Sequential bootstrapper. Legs are carried forward as running sums over the schedule dates already fixed by
+    the curve, so each schedule date is looked up a constant number of times and a full build is linear in the
+    number of knots. Instruments are expected in increasing maturity order.
+
+    The leg sums are checkpointed before every instrument, so after fit() a single quote can be changed with
+    update_quote() and only the knots from that instrument onwards are re-solved.
+
+    fit_batch() runs the same bootstrap over a matrix of quote scenarios at once, every knot df becoming an
+    array across scenarios.
+
+    quote_jacobian() differentiates the fitted bootstrap in one forward pass, giving the sensitivities of the
+    knot log dfs to every market quote without rebuilding any curve.
+    """
+
     def __init__(self, ois_instruments, swaps3m):
         self.ois_instruments = ois_instruments
         self.swaps3m = swaps3m
+        self.curves = {}
+        # leg sums before each instrument, used to resume the bootstrap part way along the curve
+        self.ois_checkpoints = []
+        self.ibor3m_checkpoints = []
 
-    def bootstrap_ois(self):
-        curve_model = LogLinearBootstrappedCurveModel()
+    @staticmethod
+    def extend_leg(leg, schedule, stop, cashflow):
+        # leg is (dates summed, running total), extend it over schedule up to (excluding) stop
+        count, total = leg
+        for time in schedule[count:stop]:
+            # not +=, totals may be per scenario arrays shared with checkpoints
+            total = total + cashflow(time)
+
+        return max(count, stop), total
+
+    @staticmethod
+    def quote(instrument):
+        # market price for OIS futures, fixed rate for swaps, i.e. what the instrument is constructed with
+        return instrument.market_price if isinstance(instrument, OISFuture) else instrument.fixed_rate
+
+    @staticmethod
+    def resume_model(curve, start):
+        # fresh model holding the knots solved before instrument start, so curves handed out earlier are untouched
+        if curve is None or start == 0:
+            return LogLinearBootstrappedCurveModel()
+
+        return LogLinearBootstrappedCurveModel(curve.curve_model.times[:start + 1], curve.curve_model.dfs[:start + 1])
+
+    def bootstrap_ois(self, start=0, quotes=None):
+        curve_model = self.resume_model(self.curves.get("ois"), start)
+        # running annuity per fixed leg frequency
+        annuities = dict(self.ois_checkpoints[start]) if start > 0 else {}
+        del self.ois_checkpoints[start:]
+
+        for i, instrument in enumerate(self.ois_instruments[start:], start):
+            self.ois_checkpoints.append(dict(annuities))
+            quote = quotes[i] if quotes is not None else self.quote(instrument)
 
-        for i, instrument in enumerate(self.ois_instruments):
             if isinstance(instrument, OISFuture):
-                df = curve_model.df(instrument.maturity - instrument.accrual) / (1 + instrument.accrual * instrument.market_rate())
+                df = curve_model.df(instrument.maturity - instrument.accrual) / (1 + instrument.accrual * (1 - quote))
                 curve_model.add_knot(instrument.maturity, df)
             elif isinstance(instrument, OISSwap):
-                schedule = np.arange(instrument.freq, instrument.maturity + 1e-12, instrument.freq)
-                k = sum(instrument.freq * instrument.fixed_rate * curve_model.df(t) for t in schedule[:-1])
-                df = (1 - k) / (instrument.freq * instrument.fixed_rate + 1)
+                freq = instrument.freq
+                schedule = np.arange(freq, instrument.maturity + 1e-12, freq)
+
+                def annuity_cashflow(time):
+                    return freq * curve_model.df(time)
+
+                # dates up to the last knot are final, dates past it are extrapolated and not carried forward
+                fixed = np.searchsorted(schedule[:-1], curve_model.times[-1], side="right")
+                annuities[freq] = self.extend_leg(annuities.get(freq, (0, 0.0)), schedule, fixed, annuity_cashflow)
+                _, annuity = self.extend_leg(annuities[freq], schedule, len(schedule) - 1, annuity_cashflow)
+
+                k = quote * annuity
+                df = (1 - k) / (instrument.freq * quote + 1)
                 curve_model.add_knot(instrument.maturity, df)
             else:
                 raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for OIS bootstrapping")
 
         return Curve(curve_model)
 
-    def bootstrap_ibor3m(self, ois_curve):
-        curve_model = LogLinearBootstrappedCurveModel()
+    def bootstrap_ibor3m(self, ois_curve, start=0, quotes=None):
+        curve_model = self.resume_model(self.curves.get("3m"), start)
+        accrual = 0.25
+        # running OIS annuity and float leg over the quarterly grid
+        annuity, float_leg = self.ibor3m_checkpoints[start] if start > 0 else ((0, 0.0), (0, 0.0))
+        del self.ibor3m_checkpoints[start:]
 
-        for i, swap in enumerate(self.swaps3m):
-            schedule = np.arange(0.25, swap.maturity + 1e-12, 0.25)
-            fixed_leg_pv = swap.fixed_rate * sum(0.25 * ois_curve.df(time) for time in schedule)
-            k = sum(ois_curve.df(time) * curve_model.forward_rate(time - 0.25, time) * 0.25 for time in schedule[:-1])
+        def annuity_cashflow(time):
+            return accrual * ois_curve.df(time)
+
+        def float_cashflow(time):
+            return ois_curve.df(time) * curve_model.forward_rate(time - accrual, time) * accrual
+
+        for i, swap in enumerate(self.swaps3m[start:], start):
+            self.ibor3m_checkpoints.append((annuity, float_leg))
+            quote = quotes[i] if quotes is not None else swap.fixed_rate
+
+            schedule = np.arange(accrual, swap.maturity + 1e-12, accrual)
+            annuity = self.extend_leg(annuity, schedule, len(schedule), annuity_cashflow)
+            fixed_leg_pv = quote * annuity[1]
+
+            # dates up to the last knot are final, dates past it are extrapolated and not carried forward
+            fixed = np.searchsorted(schedule[:-1], curve_model.times[-1], side="right")
+            float_leg = self.extend_leg(float_leg, schedule, fixed, float_cashflow)
+            _, k = self.extend_leg(float_leg, schedule, len(schedule) - 1, float_cashflow)
 
             df = curve_model.df(swap.maturity - 0.25) * ois_curve.df(swap.maturity) / (ois_curve.df(swap.maturity) + fixed_leg_pv - k)
 
@@ -43,10 +119,147 @@ class MultiCurveBootstrapper:
         return Curve(curve_model)
 
     def fit(self):
+        self.curves = {}
         ois_curve = self.bootstrap_ois()
+        self.curves["ois"] = ois_curve
         ibor_3m_curve = self.bootstrap_ibor3m(ois_curve)
+        self.curves["3m"] = ibor_3m_curve
+
+        return {
+            "ois" : ois_curve,
+            "3m" : ibor_3m_curve
+        }
+
+    def fit_batch(self, quotes):
+        """
+        Bootstrap every row of an (n_scenarios x n_instruments) quote matrix in one pass, columns ordered as
+        ois_instruments followed by swaps3m. Returns curves whose knot dfs are arrays across scenarios, so df(t)
+        gives shape (n_scenarios,) + t.shape.
+        """
+        quotes = np.asarray(quotes, dtype=float)
+        ois_count = len(self.ois_instruments)
+        if quotes.ndim != 2 or quotes.shape[1] != ois_count + len(self.swaps3m):
+            raise ValueError(f"Expected a quote matrix with {ois_count + len(self.swaps3m)} columns, got shape {quotes.shape}")
+
+        # separate bootstrapper so the batch run does not touch the state kept for update_quote
+        batch_bootstrapper = MultiCurveBootstrapper(self.ois_instruments, self.swaps3m)
+        ois_curve = batch_bootstrapper.bootstrap_ois(quotes=quotes[:, :ois_count].T)
+        ibor_3m_curve = batch_bootstrapper.bootstrap_ibor3m(ois_curve, quotes=quotes[:, ois_count:].T)
 
         return {
             "ois" : ois_curve,
             "3m" : ibor_3m_curve
         }
+
+    @staticmethod
+    def log_df_gradient(curve_model, t):
+        # derivatives of log df(t) with respect to the knot log dfs of curve_model after t=0
+        return curve_model.df_gradient(t) / np.asarray(curve_model.df(t))[..., None]
+
+    def quote_jacobian(self):
+        """
+        Jacobian of the knot log dfs (excluding t=0) with respect to the market quotes, by forward differentiation
+        of each bootstrap step against the curve solved before it. Columns are ordered as ois_instruments followed
+        by swaps3m, rows as the knots, matching df_gradient() and the "ois"/"3m" price gradients, so
+        gradients["ois"] @ jacobian["ois"] + gradients["3m"] @ jacobian["3m"] is the par quote risk of a trade.
+        """
+        if not self.curves:
+            raise Exception("Curves are not yet bootstrapped, run fit() first")
+
+        ois_count = len(self.ois_instruments)
+        quote_count = ois_count + len(self.swaps3m)
+        ois_curve = self.curves["ois"]
+        ois_jacobian = np.zeros((ois_count, quote_count))
+
+        for i, instrument in enumerate(self.ois_instruments):
+            curve_model = self.resume_model(ois_curve, i)
+            quote = self.quote(instrument)
+
+            if isinstance(instrument, OISFuture):
+                # log df = log D(maturity - accrual) - log(1 + accrual * (1 - quote))
+                d_knots = self.log_df_gradient(curve_model, instrument.maturity - instrument.accrual)
+                d_quote = instrument.accrual / (1 + instrument.accrual * (1 - quote))
+            elif isinstance(instrument, OISSwap):
+                # log df = log(1 - quote * annuity) - log(1 + freq * quote), annuity over all but the last date
+                freq = instrument.freq
+                schedule = np.arange(freq, instrument.maturity + 1e-12, freq)[:-1]
+                annuity = freq * np.sum(curve_model.df(schedule))
+                d_annuity = freq * np.sum(curve_model.df_gradient(schedule), axis=0)
+                d_knots = -quote * d_annuity / (1 - quote * annuity)
+                d_quote = -annuity / (1 - quote * annuity) - freq / (1 + freq * quote)
+            else:
+                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for OIS bootstrapping")
+
+            ois_jacobian[i] = d_knots @ ois_jacobian[:i]
+            ois_jacobian[i, i] += d_quote
+
+        ibor_3m_curve = self.curves["3m"]
+        ibor_3m_jacobian = np.zeros((len(self.swaps3m), quote_count))
+        accrual = 0.25
+
+        for i, swap in enumerate(self.swaps3m):
+            curve_model = self.resume_model(ibor_3m_curve, i)
+            quote = swap.fixed_rate
+            schedule = np.arange(accrual, swap.maturity + 1e-12, accrual)
+            float_schedule = schedule[:-1]
+
+            # log df = log D3m(maturity - accrual) + log P(maturity) - log(P(maturity) + quote * annuity - float leg)
+            ois_df, d_ois_df = ois_curve.df(swap.maturity), ois_curve.df_gradient(swap.maturity)
+            annuity = accrual * np.sum(ois_curve.df(schedule))
+            d_annuity = accrual * np.sum(ois_curve.df_gradient(schedule), axis=0)
+
+            ratios = curve_model.df(float_schedule - accrual) / curve_model.df(float_schedule)
+            float_leg = np.sum(ois_curve.df(float_schedule) * (ratios - 1))
+            d_float_leg_ois = (ratios - 1) @ ois_curve.df_gradient(float_schedule)
+            d_float_leg_3m = (ois_curve.df(float_schedule) * ratios) @ (
+                self.log_df_gradient(curve_model, float_schedule - accrual) - self.log_df_gradient(curve_model, float_schedule)
+            )
+
+            denominator = ois_df + quote * annuity - float_leg
+            d_ois = d_ois_df / ois_df - (d_ois_df + quote * d_annuity - d_float_leg_ois) / denominator
+            d_3m = self.log_df_gradient(curve_model, swap.maturity - accrual) + d_float_leg_3m / denominator
+
+            ibor_3m_jacobian[i] = d_ois @ ois_jacobian + d_3m @ ibor_3m_jacobian[:i]
+            ibor_3m_jacobian[i, ois_count + i] -= annuity / denominator
+
+        return {
+            "ois" : ois_jacobian,
+            "3m" : ibor_3m_jacobian
+        }
+
+    def update_quote(self, curve, instrument_index, quote):
+        """
+        Replace the quote of one instrument (market price for OIS futures, fixed rate for swaps) and re-solve only
+        the knots at and after it. The 3m curve is only re-bootstrapped when the OIS knots actually moved, and then
+        only from the first swap that sees the changed part of the OIS curve.
+        """
+        if not self.curves:
+            raise Exception("Curves are not yet bootstrapped, run fit() first")
+
+        if curve == "ois":
+            instruments = self.ois_instruments = list(self.ois_instruments)
+        elif curve == "3m":
+            instruments = self.swaps3m = list(self.swaps3m)
+        else:
+            raise ValueError(f"Curve {curve} is not supported")
+
+        instrument = instruments[instrument_index]
+        instruments[instrument_index] = instrument.__class__(instrument.maturity, quote, instrument.notional)
+
+        if curve == "ois":
+            previous_ois_dfs = self.curves["ois"].curve_model.dfs
+            ois_curve = self.bootstrap_ois(instrument_index)
+            self.curves["ois"] = ois_curve
+
+            if ois_curve.curve_model.dfs != previous_ois_dfs:
+                # the OIS curve is unchanged up to the knot before the updated instrument
+                unchanged_until = ois_curve.curve_model.times[instrument_index]
+                start = next((i for i, swap in enumerate(self.swaps3m) if swap.maturity > unchanged_until), len(self.swaps3m))
+                self.curves["3m"] = self.bootstrap_ibor3m(ois_curve, start)
+        else:
+            self.curves["3m"] = self.bootstrap_ibor3m(self.curves["ois"], instrument_index)
+
+        return {
+            "ois" : self.curves["ois"],
+            "3m" : self.curves["3m"]
+        }
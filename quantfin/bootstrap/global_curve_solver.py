@@ -0,0 +1,114 @@
+import numpy as np
+from scipy.sparse import diags, triu
+from scipy.sparse.linalg import spsolve, spsolve_triangular
+
+from quantfin.curves.curve import Curve
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.instruments.cashflow_matrix import CashflowMatrix
+from quantfin.instruments.ois_future import OISFuture
+
+
+class GlobalCurveSolver:
+    """
+    Fits every knot of piecewise log-linear OIS and 3m curves at once instead of one instrument at a time. Knots sit
+    at the instrument pillars (the end of the accrual for OIS futures, the maturity for swaps) and the knot log dfs
+    are solved by Gauss-Newton on the compiled cashflow matrix.
+
+    Each instrument only depends on knots up to its pillar, so with one instrument per pillar the sparse Jacobian is
+    lower triangular and a Newton step is a sparse triangular solve. Instruments sharing a pillar (e.g. a future and
+    a swap ending on the same date) make the system overdetermined, it is then solved in the least squares sense
+    through the sparse damped normal equations.
+
+    Futures are priced as OISFuture.price does, accruing from maturity to maturity + accrual. The sequential
+    bootstrapper instead treats maturity as the end of the accrual period, so the two give different OIS curves from
+    the same futures quotes.
+    """
+
+    def __init__(self, ois_instruments, swaps3m, max_iter=50, tol=1e-10):
+        self.ois_instruments = ois_instruments
+        self.swaps3m = swaps3m
+        self.max_iter = max_iter
+        self.tol = tol
+        self.iterations = {}
+
+    @staticmethod
+    def pillar(instrument):
+        if isinstance(instrument, OISFuture):
+            return instrument.maturity + instrument.accrual
+        return instrument.maturity
+
+    @staticmethod
+    def build_curve(times, log_dfs):
+        return Curve(LogLinearBootstrappedCurveModel([0.0] + list(times), [1.0] + list(np.exp(log_dfs))))
+
+    @staticmethod
+    def step(J, r, lam):
+        # plain Newton step when every pillar is hit by exactly one instrument, damped least squares otherwise
+        if lam == 0 and J.shape[0] == J.shape[1] and triu(J, 1).nnz == 0:
+            return spsolve_triangular(J, -r, lower=True)
+
+        normal = (J.T @ J).tocsc()
+        return spsolve(normal + lam * diags(normal.diagonal()), -(J.T @ r))
+
+    def solve(self, instruments, ois_curve=None, previous=None):
+        # rows ordered by pillar so that the Jacobian is lower triangular in the square case
+        instruments = sorted(instruments, key=self.pillar)
+        cashflows = CashflowMatrix(instruments, ois_curve)
+        times = np.unique([self.pillar(instrument) for instrument in instruments])
+
+        # warm start from an earlier curve, else a flat 2% curve
+        x = np.log(previous.df(times)) if previous is not None else -0.02 * times
+        curve = self.build_curve(times, x)
+        r = cashflows.residuals(curve)
+        J = cashflows.jacobian(curve, sparse=True)
+        lam = 0.0
+        iterations = 0
+        converged = False
+
+        # every knot needs an instrument whose cashflows move it, else the normal equations are singular
+        columns = J.tocsc()
+        columns.eliminate_zeros()
+        if np.any(np.diff(columns.indptr) == 0):
+            raise Exception("Instruments do not determine every knot of the curve")
+
+        for k in range(self.max_iter):
+            iterations = k + 1
+
+            while True:
+                p = self.step(J, r, lam)
+                if np.linalg.norm(p) < self.tol:
+                    converged = True
+                    break
+
+                curve_new = self.build_curve(times, x + p)
+                r_new = cashflows.residuals(curve_new)
+
+                if np.linalg.norm(r_new) < np.linalg.norm(r):
+                    x, curve, r = x + p, curve_new, r_new
+                    lam = lam / 10 if lam > 1e-12 else 0.0
+                    break
+
+                lam = max(lam * 10, 1e-8)
+                if lam > 1e8:
+                    raise Exception("Global curve solve is not converging")
+
+            if converged:
+                break
+
+            J = cashflows.jacobian(curve, sparse=True)
+
+        if not converged:
+            raise Exception(f"Global curve solve did not converge in {self.max_iter} iterations")
+
+        return curve, iterations
+
+    def fit(self, previous=None):
+        previous = previous if previous is not None else {}
+
+        ois_curve, self.iterations["ois"] = self.solve(self.ois_instruments, previous=previous.get("ois"))
+        ibor_3m_curve, self.iterations["3m"] = self.solve(self.swaps3m, ois_curve, previous=previous.get("3m"))
+
+        return {
+            "ois" : ois_curve,
+            "3m" : ibor_3m_curve
+        }
@@ -1,22 +1,107 @@
+from bisect import bisect_left
+
+import numpy as np
+
+
+
 class Interpolator:
+    """
+    Freezes the knots into contiguous arrays once, brackets lookups by binary search. ys may carry leading batch
+    axes with the knots along the last axis, lookups then return shape batch + x.shape.
+
+    Scalar lookups skip NumPy entirely and bisect plain float copies of the knots, made on the first one; array
+    lookups agree with them to within an ulp or two. Float arrays passed in (e.g. views into a snapshot) are used
+    in place.
+    """
+
     def __init__(self, xs, ys):
-        self.xs = xs
-        self.ys = ys
+        self.x_buffer = np.asarray(xs, dtype=float)
+        self.y_buffer = np.asarray(ys, dtype=float)
+        self.size = len(self.x_buffer)
+        self.xs = self.x_buffer
+        self.ys = self.y_buffer
+        self.xs_list = None
+        self.ys_list = None
+
+    def append(self, x, y):
+        """Adds a knot to the right of the existing ones, extending the frozen arrays in place"""
+        if self.size == self.x_buffer.shape[0]:
+            # double the capacity so a bootstrap adding knots one by one costs amortised O(1) per knot
+            self.x_buffer = np.concatenate([self.x_buffer, np.empty_like(self.x_buffer)])
+            self.y_buffer = np.concatenate([self.y_buffer, np.empty_like(self.y_buffer)], axis=-1)
+
+        self.x_buffer[self.size] = x
+        self.y_buffer[..., self.size] = y
+        self.size += 1
+        self.xs = self.x_buffer[:self.size]
+        self.ys = self.y_buffer[..., :self.size]
+        if self.xs_list is not None:
+            self.xs_list.append(float(x))
+            self.ys_list.append(float(y))
+
+    def bracket(self, x):
+        # index of the first knot at or to the right of x, extrapolating off the end segments
+        return np.clip(np.searchsorted(self.xs, x, side="left"), 1, len(self.xs) - 1)
+
+    def bracket_scalar(self, x):
+        return min(max(bisect_left(self.xs_list, x), 1), len(self.xs_list) - 1)
+
+    def interpolate(self, x, i):
+        raise NotImplementedError
+
+    def interpolate_scalar(self, x, i):
+        raise NotImplementedError
 
-class LogLinearInterpolator(Interpolator):
     def __call__(self, x):
-        i, point = 0, 0
-        for i, point in enumerate(self.xs):
-            if x == point:
-                return self.ys[i]
-            elif x > point:
-                continue
-            else:
-                break
-
-        return (self.ys[i - 1] ** ((self.xs[i] - x) / (self.xs[i] - self.xs[i - 1]))) * (
-                    self.ys[i] ** ((x - self.xs[i - 1]) / (self.xs[i] - self.xs[i - 1])))
+        if isinstance(x, (float, int)) and self.ys.ndim == 1:
+            if self.xs_list is None:
+                self.xs_list, self.ys_list = self.xs.tolist(), self.ys.tolist()
+
+            x = float(x)
+            if len(self.xs_list) == 1:
+                return self.ys_list[0]
+
+            i = self.bracket_scalar(x)
+            return self.ys_list[i] if x == self.xs_list[i] else self.interpolate_scalar(x, i)
+
+        x_arr = np.asarray(x, dtype=float)
+
+        # a single knot gives a flat curve
+        if len(self.xs) == 1:
+            values = self.ys[..., np.zeros(x_arr.shape, dtype=int)]
+        else:
+            i = self.bracket(x_arr)
+            values = np.where(x_arr == self.xs[i], self.ys[..., i], self.interpolate(x_arr, i))
+
+        return values if values.ndim else float(values)
+
+class LogLinearInterpolator(Interpolator):
+    def __init__(self, xs, ys):
+        super().__init__(xs, ys)
+        self.log_y_buffer = np.log(self.y_buffer)
+        self.log_ys = self.log_y_buffer
+
+    def append(self, x, y):
+        super().append(x, y)
+        if self.log_y_buffer.shape != self.y_buffer.shape:
+            self.log_y_buffer = np.concatenate([self.log_y_buffer, np.empty_like(self.log_y_buffer)], axis=-1)
+
+        self.log_y_buffer[..., self.size - 1] = np.log(y)
+        self.log_ys = self.log_y_buffer[..., :self.size]
+
+    def interpolate(self, x, i):
+        x_left, x_right = self.xs[i - 1], self.xs[i]
+        return np.exp(((x_right - x) * self.log_ys[..., i - 1] + (x - x_left) * self.log_ys[..., i]) / (x_right - x_left))
+
+    def interpolate_scalar(self, x, i):
+        x_left, x_right = self.xs_list[i - 1], self.xs_list[i]
+        return self.ys_list[i - 1] ** ((x_right - x) / (x_right - x_left)) * self.ys_list[i] ** ((x - x_left) / (x_right - x_left))
 
 class LinearInterpolator(Interpolator):
-    def __call__(self, x):
-        pass
+    def interpolate(self, x, i):
+        x_left, x_right = self.xs[i - 1], self.xs[i]
+        return ((x_right - x) * self.ys[..., i - 1] + (x - x_left) * self.ys[..., i]) / (x_right - x_left)
+
+    def interpolate_scalar(self, x, i):
+        x_left, x_right = self.xs_list[i - 1], self.xs_list[i]
+        return ((x_right - x) * self.ys_list[i - 1] + (x - x_left) * self.ys_list[i]) / (x_right - x_left)
@@ -1,18 +1,96 @@
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 class Curve:
-    def __init__(self, curve_model):
+    """
+    Wraps a curve model; df, zero_rate and forward_rate accept scalars or NumPy arrays of times.
+
+    Passing cache_size turns on an LRU cache for df and forward_rate lookups, keyed on times rounded to
+    time_quantum. Array lookups are cached per schedule, keyed on the whole array. The cache is cleared whenever
+    the model's version changes (e.g. on add_knot).
+    """
+
+    def __init__(self, curve_model, cache_size=None, time_quantum=1e-9):
         self.curve_model = curve_model
+        self.cache_size = cache_size
+        self.time_quantum = time_quantum
+        self.cache = OrderedDict()
+        self.cache_version = getattr(curve_model, "version", 0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def check_version(self):
+        version = getattr(self.curve_model, "version", 0)
+        if version != self.cache_version:
+            self.cache.clear()
+            self.cache_version = version
+
+    def store(self, key, value):
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def cached(self, key, compute):
+        self.check_version()
+        if key in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.cache_misses += 1
+        value = compute()
+        self.store(key, value)
+
+        return value
+
+    def cached_array(self, name, times, compute):
+        # keyed on the whole schedule, a pricer asking for the same schedule again costs one lookup
+        times = np.broadcast_arrays(*(np.asarray(t, dtype=float) for t in times))
+        key = (name, times[0].shape) + tuple(np.round(t / self.time_quantum).astype(np.int64).tobytes() for t in times)
+        return self.cached(key, lambda: np.asarray(compute(*times), dtype=float)).copy()
+
+    def quantise(self, t):
+        return round(t / self.time_quantum)
 
     def df(self, t):
-        return self.curve_model.df(t)
+        if self.cache_size is None:
+            return self.curve_model.df(t)
+
+        if np.ndim(t) > 0:
+            return self.cached_array("df", [t], self.curve_model.df)
+
+        return self.cached(("df", self.quantise(t)), lambda: self.curve_model.df(t))
+
+    def df_gradient(self, t, sparse=False):
+        # derivatives of df with respect to the model parameters, shape t.shape + (parameters,)
+        if sparse:
+            return self.curve_model.df_gradient(t, sparse=True)
+        return self.curve_model.df_gradient(t)
+
+    def forward_rate_gradient(self, t1, t2):
+        # derivatives of forward_rate(t1, t2) with respect to the model parameters, shape t1.shape + (parameters,)
+        df_start, df_end = np.asarray(self.df(t1))[..., None], np.asarray(self.df(t2))[..., None]
+        d_df_start, d_df_end = self.df_gradient(t1), self.df_gradient(t2)
+        return (d_df_start / df_end - df_start * d_df_end / df_end ** 2) / np.asarray(t2 - t1)[..., None]
 
     def zero_rate(self, t):
         return self.curve_model.zero_rate(t)
 
     def forward_rate(self, t1, t2):
-        return self.curve_model.forward_rate(t1, t2)
+        if self.cache_size is None:
+            return self.curve_model.forward_rate(t1, t2)
+
+        if np.ndim(t1) > 0 or np.ndim(t2) > 0:
+            return self.cached_array("forward_rate", [t1, t2], self.curve_model.forward_rate)
+
+        return self.cached(("forward_rate", self.quantise(t1), self.quantise(t2)), lambda: self.curve_model.forward_rate(t1, t2))
 
     def plot_dfs(self, t_start=None, t_end=None):
         t_start = t_start if t_start is not None else 0
@@ -20,7 +98,7 @@ class Curve:
         intervals = int((t_end - t_start) * 10)
 
         tenors = np.linspace(t_start, t_end, intervals)
-        dfs = [self.df(t) for t in tenors]
+        dfs = self.df(tenors)
 
         plt.plot(tenors, dfs, marker=".")
         plt.title("Discount Factors")
@@ -39,7 +117,7 @@ class Curve:
         if tenors[0] == 0:
             tenors[0] = tenors[0] + 1e-8
 
-        zero_rates = [self.zero_rate(t) for t in tenors]
+        zero_rates = self.zero_rate(tenors)
 
         plt.plot(tenors, zero_rates, marker=".")
         plt.title("Zero Rates")
@@ -54,7 +132,7 @@ class Curve:
         intervals = int((t_end - t_start) * 10)
 
         tenors = np.linspace(t_start, t_end, intervals)
-        forward_rates = [self.forward_rate(t, t + 0.25) for t in tenors]
+        forward_rates = self.forward_rate(tenors, tenors + 0.25)
 
         plt.plot(tenors, forward_rates, marker=".")
         plt.title("Forward Rates")
@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+
+from quantfin.curves.curve import Curve
+
+
+class CurveGrid(Curve):
+    """
+    Curve that samples any curve model's log discount factors onto a uniform time grid once, so lookups are
+    index arithmetic plus linear interpolation between two grid points. max_error is the worst absolute DF error
+    against the source model, checked at every grid midpoint and at the model's knots if it has any. With a
+    tolerance, the grid step is halved until max_error is within it. Lookups outside [0, t_max] fall back to the
+    source model.
+    """
+
+    def __init__(self, curve_model, t_max=50.0, step=1 / 52, tolerance=None, max_refinements=10):
+        # accept a built Curve as well as a bare model
+        curve_model = curve_model.curve_model if isinstance(curve_model, Curve) else curve_model
+        super().__init__(curve_model)
+
+        for i in range(max_refinements + 1):
+            self.build(t_max, step)
+            if tolerance is None or self.max_error <= tolerance:
+                break
+            step /= 2
+        else:
+            raise ValueError(f"CurveGrid could not reach tolerance {tolerance}, max error {self.max_error} at step {self.step}")
+
+    def build(self, t_max, step):
+        intervals = math.ceil(t_max / step)
+        self.step = step
+        self.t_max = intervals * step
+        self.times = np.arange(intervals + 1) * step
+        self.log_dfs = np.log(self.curve_model.df(self.times))
+        # python floats for the scalar path, which avoids NumPy call overhead per lookup
+        self.log_dfs_list = self.log_dfs.tolist()
+
+        check_times = np.concatenate([
+            self.times[:-1] + step / 2,
+            [t for t in getattr(self.curve_model, "times", []) if 0 <= t <= self.t_max]
+        ])
+        self.max_error = float(np.max(np.abs(self.df(check_times) - self.curve_model.df(check_times))))
+
+    def df(self, t):
+        if np.ndim(t) == 0:
+            if t < 0 or t > self.t_max:
+                return self.curve_model.df(t)
+
+            position = t / self.step
+            i = min(int(position), len(self.log_dfs_list) - 2)
+            w = position - i
+            return math.exp((1 - w) * self.log_dfs_list[i] + w * self.log_dfs_list[i + 1])
+
+        t_arr = np.asarray(t, dtype=float)
+        position = t_arr / self.step
+        i = np.clip(position.astype(int), 0, len(self.log_dfs) - 2)
+        w = position - i
+        dfs = np.exp((1 - w) * self.log_dfs[i] + w * self.log_dfs[i + 1])
+
+        outside = (t_arr < 0) | (t_arr > self.t_max)
+        if np.any(outside):
+            dfs = np.where(outside, self.curve_model.df(t_arr), dfs)
+
+        return dfs
+
+    def zero_rate(self, t):
+        return -np.log(self.df(t)) / t
+
+    def forward_rate(self, t1, t2):
+        return (self.df(t1) / self.df(t2) - 1) / (t2 - t1)
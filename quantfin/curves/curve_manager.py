@@ -1,28 +1,123 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from quantfin.bootstrap.bootstrapper import MultiCurveBootstrapper
+from quantfin.bootstrap.global_curve_solver import GlobalCurveSolver
 from quantfin.curves.ibor_curve_calibrator import IBORCurveCalibrator
 from quantfin.curves.ois_curve_calibrator import OISCurveCalibrator
+from quantfin.snapshot.calibration_cache import curve_from_state, curve_to_state, fingerprint
+
+
+def build_chunk(chunk, model, calibration_engine):
+    # runs in a worker process, builds every snapshot of one chunk
+    curve_manager = CurveManager()
+    return [
+        (date, curve_manager.build(ois_instruments, swaps3m, model, calibration_engine))
+        for date, ois_instruments, swaps3m in chunk
+    ]
 
 
 class CurveManager:
-    def build(self, ois_instruments, swaps3m, model="log_linear_bootstrapped", calibration_engine="scipy"):
+    @staticmethod
+    def instrument_data(instruments):
+        return [(instrument.__class__.__name__, instrument.maturity, MultiCurveBootstrapper.quote(instrument), instrument.notional) for instrument in instruments]
+
+    def build(self, ois_instruments, swaps3m, model="log_linear_bootstrapped", calibration_engine="scipy", previous=None, cache=None):
+        """cache is an optional CalibrationCache, saving it (e.g. once after a batch of builds) is left to the caller"""
+        # stats describe this build only, the sequential bootstrap reports none
+        self.calibration_stats = {}
+
+        if cache is not None:
+            # curves fitted before to exactly these quotes, model and engine are restored instead of rebuilt
+            key = fingerprint("curves", model, calibration_engine, self.instrument_data(ois_instruments), self.instrument_data(swaps3m))
+            state = cache.get(key)
+            if state is not None:
+                self.calibration_stats = {name: {"iterations": 0, "evaluations": 0, "cached": True} for name in state}
+                return {name: curve_from_state(curve_state) for name, curve_state in state.items()}
+
+            curves = self.build(ois_instruments, swaps3m, model, calibration_engine, previous)
+            cache.put(key, {name: curve_to_state(curve) for name, curve in curves.items()})
+
+            return curves
+
         if model == "log_linear_bootstrapped":
             bootstrapper = MultiCurveBootstrapper(ois_instruments, swaps3m)
             curves = bootstrapper.fit()
 
+            return {
+                "ois": curves["ois"],
+                "3m": curves["3m"]
+            }
+        elif model == "log_linear_global":
+            # all knots solved together, previous is an earlier build used as the starting curves
+            solver = GlobalCurveSolver(ois_instruments, swaps3m)
+            curves = solver.fit(previous)
+
+            self.calibration_stats = {
+                "ois": {"iterations": solver.iterations["ois"]},
+                "3m": {"iterations": solver.iterations["3m"]}
+            }
+
             return {
                 "ois": curves["ois"],
                 "3m": curves["3m"]
             }
         elif model == "nelson_siegel":
+            # previous is an earlier nelson_siegel build, used to warm start both fits
+            previous = previous if previous is not None else {}
+
             ois_curve_calibrator = OISCurveCalibrator(ois_instruments)
-            ois_curve = ois_curve_calibrator.calibrate(calibration_engine)
+            ois_curve = ois_curve_calibrator.calibrate(calibration_engine, previous=previous.get("ois"))
 
             ibor_curve_calibrator = IBORCurveCalibrator(swaps3m, ois_curve)
-            ibor_curve = ibor_curve_calibrator.calibrate(calibration_engine)
+            ibor_curve = ibor_curve_calibrator.calibrate(calibration_engine, previous=previous.get("3m"))
+
+            self.calibration_stats = {
+                "ois": {"iterations": ois_curve_calibrator.iterations, "evaluations": ois_curve_calibrator.evaluations},
+                "3m": {"iterations": ibor_curve_calibrator.iterations, "evaluations": ibor_curve_calibrator.evaluations}
+            }
 
             return {
                 "ois": ois_curve,
                 "3m": ibor_curve
             }
         else:
-            raise ValueError(f"Curve build mode {model} is not supported")
\ No newline at end of file
+            raise ValueError(f"Curve build mode {model} is not supported")
+
+    def build_batch(self, ois_instruments, swaps3m, quotes, model="log_linear_bootstrapped"):
+        """Bootstrap the curves under every row of an (n_scenarios x n_instruments) quote matrix at once"""
+        if model == "log_linear_bootstrapped":
+            bootstrapper = MultiCurveBootstrapper(ois_instruments, swaps3m)
+            curves = bootstrapper.fit_batch(quotes)
+
+            return {
+                "ois": curves["ois"],
+                "3m": curves["3m"]
+            }
+        else:
+            raise ValueError(f"Batched curve build mode {model} is not supported")
+
+    def build_many(self, snapshots, model="log_linear_bootstrapped", calibration_engine="scipy", max_workers=None, chunksize=1):
+        """
+        Build curves for an iterable of dated (date, ois_instruments, swaps3m) snapshots over a process pool,
+        yielding (date, curves) in the order the snapshots come in. Snapshots are read lazily and only a couple of
+        chunks per worker are in flight at once, so memory stays bounded however long the history is.
+        """
+        max_workers = max_workers if max_workers is not None else os.cpu_count()
+        snapshots = iter(snapshots)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+
+            while True:
+                chunk = list(itertools.islice(snapshots, chunksize))
+                if chunk:
+                    pending.append(executor.submit(build_chunk, chunk, model, calibration_engine))
+
+                # keep the pool busy but cap how far ahead of the consumer we run
+                if pending and (not chunk or len(pending) >= 2 * max_workers):
+                    yield from pending.popleft().result()
+                elif not chunk:
+                    break
@@ -3,7 +3,9 @@ from scipy.optimize import least_squares
 
 from quantfin.curves.curve import Curve
 from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+from quantfin.instruments.cashflow_matrix import CashflowMatrix
 from quantfin.instruments.swap_3m import Swap3M
+from quantfin.optimiser.base_optimiser import warm_start
 from quantfin.optimiser.gauss_newton_optimiser import GaussNewtonOptimiser
 from quantfin.optimiser.levenberg_marquardt_optimiser import LevenbergMarquardtOptimiser
 from quantfin.optimiser.sqp_optimiser import SQPOptimiser
@@ -17,38 +19,57 @@ class IBORCurveCalibrator:
         self.instruments = instruments
         self.ois_curve = ois_curve
 
+        for instrument in instruments:
+            if not isinstance(instrument, Swap3M):
+                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for IBOR curve calibration")
+
+        # compiled once against the OIS curve, reused by every residual and jacobian evaluation
+        self.cashflows = CashflowMatrix(instruments, ois_curve)
+        self.iterations = 0
+        self.evaluations = 0
+
+    def initial_guess(self, x0=None, previous=None):
+        # warm start from a previously calibrated Nelson-Siegel curve
+        curve_model = previous.curve_model if previous is not None else None
+        previous_params = [curve_model.beta0, curve_model.beta1, curve_model.beta2, curve_model.tau] if curve_model is not None else None
+        return warm_start(x0, previous_params, [0.025, 0, 0, 2])
+
     def residuals(self, params, *args):
+        self.evaluations += 1
+        beta0, beta1, beta2, tau = params
+        ibor_curve = Curve(NelsonSiegelCurveModel(beta0, beta1, beta2, tau))
+        cashflows, = args
+
+        return cashflows.residuals(ibor_curve)
+
+    def jacobian(self, params, *args):
+        # Closed form derivatives of the residuals with respect to the Nelson-Siegel params
         beta0, beta1, beta2, tau = params
         ibor_curve = Curve(NelsonSiegelCurveModel(beta0, beta1, beta2, tau))
-        instruments, ois_curve = args
+        cashflows, = args
 
-        def residual(instrument, ois_curve_inner, ibor_curve_inner):
-            if isinstance(instrument, Swap3M):
-                return instrument.price(ois_curve_inner, ibor_curve_inner)
-            else:
-                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for OIS curve calibration")
+        return cashflows.jacobian(ibor_curve)
 
-        return np.array([
-            residual(instrument, ois_curve, ibor_curve)
-            for instrument in instruments
-        ])
+    def calibrate(self, engine="scipy", x0=None, previous=None):
+        self.iterations = 0
+        self.evaluations = 0
 
-    def calibrate(self, engine="scipy"):
         if engine == "scipy":
-            instruments, ois_curve = np.array(self.instruments), self.ois_curve
-
             # initial guesses
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
 
             result = least_squares(
                 fun=self.residuals,
                 x0=x0,
-                args=(instruments, ois_curve),
+                jac=self.jacobian,
+                args=(self.cashflows,),
                 method='trf',
                 verbose=1
             )
 
             residuals = result.fun
+            # trf evaluates one jacobian per iteration
+            self.iterations = result.njev
 
             # RMS error
             rms_error = np.sqrt(np.mean(residuals ** 2))
@@ -63,22 +84,26 @@ class IBORCurveCalibrator:
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         elif engine == "gauss_newton":
             optimiser = GaussNewtonOptimiser()
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
-                (self.instruments, self.ois_curve)
+                (self.cashflows,),
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             beta0_fit, beta1_fit, beta2_fit, tau_fit = params
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         elif engine == "levenberg_marquardt":
             optimiser = LevenbergMarquardtOptimiser()
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
-                (self.instruments, self.ois_curve)
+                (self.cashflows,),
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             beta0_fit, beta1_fit, beta2_fit, tau_fit = params
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         else:
@@ -1,18 +1,63 @@
 from quantfin.bootstrap.interpolation import LogLinearInterpolator
 import numpy as np
+from scipy.sparse import csr_matrix
 
 class LogLinearBootstrappedCurveModel:
-    def __init__(self):
-        self.times = [0]
-        self.dfs = [1]
+    def __init__(self, times=None, dfs=None):
+        # arrays (e.g. views into a snapshot) are kept as they are, other knot sequences are copied into lists
+        self.times = times if isinstance(times, np.ndarray) else list(times) if times is not None else [0]
+        self.dfs = dfs if isinstance(dfs, np.ndarray) else list(dfs) if dfs is not None else [1]
+        self.interpolator = None
+        # bumped whenever the knots change, lets caches built on top of the model invalidate themselves
+        self.version = 0
 
     def add_knot(self, t, df):
+        if isinstance(self.times, np.ndarray) or isinstance(self.dfs, np.ndarray):
+            self.times, self.dfs = list(self.times), list(self.dfs)
+
         self.times.append(t)
         self.dfs.append(df)
+        self.version += 1
+
+        interpolator = self.interpolator
+        if interpolator is not None and t > interpolator.xs[-1] and np.shape(df) == interpolator.ys.shape[:-1]:
+            # knots arrive in order during a bootstrap, extend the frozen arrays rather than refreezing them all
+            interpolator.append(t, df)
+        else:
+            self.interpolator = None
+
+    def get_interpolator(self):
+        if self.interpolator is None:
+            # knot dfs may be per scenario arrays, stack them with the knots along the last axis
+            dfs = self.dfs if isinstance(self.dfs, np.ndarray) else np.stack(np.broadcast_arrays(*self.dfs), axis=-1)
+            self.interpolator = LogLinearInterpolator(self.times, dfs)
+        return self.interpolator
 
     def df(self, t):
-        interpolator = LogLinearInterpolator(self.times, self.dfs)
-        return interpolator(t)
+        return self.get_interpolator()(t)
+
+    def df_gradient(self, t, sparse=False):
+        # derivatives of df with respect to the log DFs of the knots after t=0, shape t.shape + (knots - 1,)
+        # sparse gives a (times, knots - 1) csr matrix for 1-D t, each row has at most the two bracketing knots
+        interpolator = self.get_interpolator()
+        t_arr = np.asarray(t, dtype=float)
+        dfs = np.asarray(self.df(t_arr)).reshape(-1)
+        rows = np.arange(dfs.size)
+        i = interpolator.bracket(t_arr).reshape(-1) if len(self.times) > 1 else np.zeros(dfs.size, dtype=int)
+        x_left, x_right = interpolator.xs[i - 1], interpolator.xs[i]
+        w = (t_arr.reshape(-1) - x_left) / (x_right - x_left) if len(self.times) > 1 else np.zeros(dfs.size)
+
+        if sparse:
+            rows, columns, values = np.concatenate([rows, rows]), np.concatenate([i - 2, i - 1]), np.concatenate([dfs * (1 - w), dfs * w])
+            keep = (columns >= 0) & (values != 0)
+            return csr_matrix((values[keep], (rows[keep], columns[keep])), shape=(dfs.size, len(self.times) - 1))
+
+        gradient = np.zeros((dfs.size, len(self.times)))
+        if len(self.times) > 1:
+            gradient[rows, i - 1] = dfs * (1 - w)
+            gradient[rows, i] = dfs * w
+
+        return gradient[:, 1:].reshape(t_arr.shape + (len(self.times) - 1,))
 
     def zero_rate(self, t):
         return -np.log(self.df(t)) / t
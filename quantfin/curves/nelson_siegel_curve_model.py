@@ -1,24 +1,54 @@
 import math
+
 import numpy as np
 
 class NelsonSiegelCurveModel:
     def __init__(self, beta0, beta1, beta2, tau):
+        # bumped whenever a parameter is set, lets caches built on top of the model invalidate themselves
+        self.version = 0
         self.beta0 = beta0
         self.beta1 = beta1
         self.beta2 = beta2
         self.tau = tau
 
+    def __setattr__(self, name, value):
+        if name in ("beta0", "beta1", "beta2", "tau"):
+            self.__dict__["version"] += 1
+        self.__dict__[name] = value
+
     def df(self, t):
-        if t <= 0.0:
-            return 1.0
+        if isinstance(t, (float, int)):
+            if t <= 0.0:
+                return 1.0
+
+            decay = math.exp(-t / self.tau)
+            return math.exp(-(self.beta0 * t + (self.beta1 + self.beta2) * (1 - decay) * self.tau - self.beta2 * t * decay))
+
+        t_arr = np.asarray(t, dtype=float)
+
+        decay = np.exp(-t_arr / self.tau)
+        power_term = self.beta0 * t_arr + (self.beta1 + self.beta2) * (1 - decay) * self.tau - self.beta2 * t_arr * decay
+        df = np.where(t_arr <= 0.0, 1.0, np.exp(-power_term))
+
+        return df if t_arr.ndim else float(df)
+
+    def df_gradient(self, t):
+        # closed form derivatives of df with respect to (beta0, beta1, beta2, tau), shape t.shape + (4,)
+        t_arr = np.asarray(t, dtype=float)
 
-        power_term = self.beta0 * t + (self.beta1 + self.beta2) * (1 - math.exp(-t / self.tau)) * self.tau - self.beta2 * t * math.exp(-t / self.tau)
-        df = math.exp(-power_term)
+        decay = np.exp(-t_arr / self.tau)
+        d_power_term = np.stack([
+            t_arr,
+            (1 - decay) * self.tau,
+            (1 - decay) * self.tau - t_arr * decay,
+            (self.beta1 + self.beta2) * (1 - decay - t_arr * decay / self.tau) - self.beta2 * t_arr ** 2 * decay / self.tau ** 2
+        ], axis=-1)
+        gradient = -np.asarray(self.df(t_arr))[..., None] * d_power_term
 
-        return df
+        return np.where((t_arr <= 0.0)[..., None], 0.0, gradient)
 
     def zero_rate(self, t):
         return -np.log(self.df(t)) / t
 
     def forward_rate(self, t1, t2):
-        return (self.df(t1) / self.df(t2) - 1) / (t2 - t1)
\ No newline at end of file
+        return (self.df(t1) / self.df(t2) - 1) / (t2 - t1)
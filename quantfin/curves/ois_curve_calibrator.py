@@ -3,8 +3,10 @@ from scipy.optimize import least_squares
 
 from quantfin.curves.curve import Curve
 from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+from quantfin.instruments.cashflow_matrix import CashflowMatrix
 from quantfin.instruments.ois_future import OISFuture
 from quantfin.instruments.ois_swap import OISSwap
+from quantfin.optimiser.base_optimiser import warm_start
 from quantfin.optimiser.gauss_newton_optimiser import GaussNewtonOptimiser
 from quantfin.optimiser.levenberg_marquardt_optimiser import LevenbergMarquardtOptimiser
 from quantfin.optimiser.sqp_optimiser import SQPOptimiser
@@ -17,40 +19,57 @@ class OISCurveCalibrator:
     def __init__(self, instruments):
         self.instruments = instruments
 
+        for instrument in instruments:
+            if not isinstance(instrument, OISFuture) and not isinstance(instrument, OISSwap):
+                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for OIS curve calibration")
+
+        # compiled once, reused by every residual and jacobian evaluation
+        self.cashflows = CashflowMatrix(instruments)
+        self.iterations = 0
+        self.evaluations = 0
+
+    def initial_guess(self, x0=None, previous=None):
+        # warm start from a previously calibrated Nelson-Siegel curve
+        curve_model = previous.curve_model if previous is not None else None
+        previous_params = [curve_model.beta0, curve_model.beta1, curve_model.beta2, curve_model.tau] if curve_model is not None else None
+        return warm_start(x0, previous_params, [0.025, 0, 0, 2])
+
     def residuals(self, params, *args):
+        self.evaluations += 1
         beta0, beta1, beta2, tau = params
         ois_curve = Curve(NelsonSiegelCurveModel(beta0, beta1, beta2, tau))
-        instruments = args
-
-        def residual(instrument, ois_curve_inner):
-            if isinstance(instrument, OISFuture):
-                return instrument.price(ois_curve_inner) - instrument.market_price
-            elif isinstance(instrument, OISSwap):
-                return instrument.price(ois_curve_inner)
-            else:
-                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for OIS curve calibration")
+        cashflows, = args
 
-        return np.array([
-            residual(instrument, ois_curve)
-            for instrument in instruments
-        ])
+        return cashflows.residuals(ois_curve)
 
-    def calibrate(self, engine="scipy"):
-        if engine == "scipy":
-            instruments = np.array(self.instruments)
+    def jacobian(self, params, *args):
+        # Closed form derivatives of the residuals with respect to the Nelson-Siegel params
+        beta0, beta1, beta2, tau = params
+        ois_curve = Curve(NelsonSiegelCurveModel(beta0, beta1, beta2, tau))
+        cashflows, = args
+
+        return cashflows.jacobian(ois_curve)
 
+    def calibrate(self, engine="scipy", x0=None, previous=None):
+        self.iterations = 0
+        self.evaluations = 0
+
+        if engine == "scipy":
             # initial guesses
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
 
             result = least_squares(
                 fun=self.residuals,
                 x0=x0,
-                args=instruments,
+                jac=self.jacobian,
+                args=(self.cashflows,),
                 method='trf',
                 verbose=1
             )
 
             residuals = result.fun
+            # trf evaluates one jacobian per iteration
+            self.iterations = result.njev
 
             # RMS error
             rms_error = np.sqrt(np.mean(residuals ** 2))
@@ -65,22 +84,26 @@ class OISCurveCalibrator:
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         elif engine == "gauss_newton":
             optimiser = GaussNewtonOptimiser()
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
-                self.instruments
+                (self.cashflows,),
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             beta0_fit, beta1_fit, beta2_fit, tau_fit = params
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         elif engine == "levenberg_marquardt":
             optimiser = LevenbergMarquardtOptimiser()
-            x0 = np.array([0.025, 0, 0, 2])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
-                self.instruments
+                (self.cashflows,),
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             beta0_fit, beta1_fit, beta2_fit, tau_fit = params
             print("Fitted params:", beta0_fit, beta1_fit, beta2_fit, tau_fit)
         else:
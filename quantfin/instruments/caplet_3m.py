@@ -14,17 +14,33 @@ class Caplet3M:
     def forward_rate(self, ibor_curve):
         return ibor_curve.forward_rate(self.expiry, self.expiry + self.accrual)
 
-    def price(self, ois_curve, ibor_curve, vol_surface):
+    def price(self, ois_curve, ibor_curve, vol_surface, gradient=False):
         notional = self.notional
         expiry = self.expiry
         strike = self.strike
         forward = self.forward_rate(ibor_curve)
         accrual = self.accrual
         df = ois_curve.df(expiry)
-        sigma = vol_surface.get_vol(expiry, strike, forward)
+        if gradient:
+            sigma, d_sigma = vol_surface.get_vol(expiry, strike, forward, gradient=True)
+        else:
+            sigma = vol_surface.get_vol(expiry, strike, forward)
         d_1 = (math.log(forward / strike) + (sigma ** 2) * expiry / 2) / (sigma * math.sqrt(expiry))
         d_2 = d_1 - sigma * math.sqrt(expiry)
 
         price = notional * accrual * df * (forward * norm.cdf(d_1) - strike * norm.cdf(d_2))
 
-        return price
+        if not gradient:
+            return price
+
+        # adjoints of the price back through the vol, the forward and the discount factor
+        vega = notional * accrual * df * forward * norm.pdf(d_1) * math.sqrt(expiry)
+        d_forward = notional * accrual * df * norm.cdf(d_1) + vega * d_sigma["forward"]
+
+        d_forward_rate = ibor_curve.forward_rate_gradient(expiry, expiry + accrual)
+
+        return price, {
+            "ois": price / df * ois_curve.df_gradient(expiry),
+            "3m": d_forward * d_forward_rate,
+            "vol": {key: vega * d_params for key, d_params in d_sigma["sabr"].items()}
+        }
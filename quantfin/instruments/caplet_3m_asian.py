@@ -18,22 +18,30 @@ class Caplet3MAsian:
     """
     Monte Carlo implementation of asian caplet price, uses SABR model dF = sigma * F * sqrt(dT) * z
     Avoids negative values by truncating forward rates at 0, which will introduce slight bias.
+    With gradient=True also returns pathwise derivatives on the same paths, chained through the vol, the forward and
+    the discount factor like Caplet3M.
     """
-    def price(self, ois_curve, ibor_curve, vol_surface, iterations=1000, increment=0.001):
+    def price(self, ois_curve, ibor_curve, vol_surface, iterations=1000, increment=0.001, gradient=False):
         notional = self.notional
         expiry = self.expiry
         strike = self.strike
         forward = self.forward_rate(ibor_curve)
         accrual = self.accrual
 
-        sigma = vol_surface.get_vol(expiry, strike, forward)
+        if gradient:
+            sigma, d_sigma = vol_surface.get_vol(expiry, strike, forward, gradient=True)
+        else:
+            sigma = vol_surface.get_vol(expiry, strike, forward)
         df = ois_curve.df(expiry)
 
         C_list = []
+        dC_dF_list = []
+        dC_dsigma_list = []
 
         for i in range(iterations):
             F_list = []
             F_list.append(forward)
+            dF_dsigma_list = [0.0]
             timesteps = int(expiry / increment)
 
             for j in range(timesteps):
@@ -41,9 +49,31 @@ class Caplet3MAsian:
                 # here we use truncation at 0
                 F_pos = F_list[-1] + sigma * F_list[-1] * math.sqrt(increment) * z
                 F_list.append(F_pos)
+                if gradient:
+                    shock = math.sqrt(increment) * z
+                    dF_dsigma_list.append(dF_dsigma_list[-1] + (sigma * dF_dsigma_list[-1] + F_list[-2]) * shock)
 
             F = sum(F_list[1:]) / timesteps
             C = notional * accrual * df * max(F - strike, 0)
             C_list.append(C)
 
-        return sum(C_list) / iterations
+            if gradient and F > strike:
+                # every path point scales with the starting forward
+                dC_dF_list.append(notional * accrual * df * F / forward)
+                dC_dsigma_list.append(notional * accrual * df * sum(dF_dsigma_list[1:]) / timesteps)
+
+        price = sum(C_list) / iterations
+
+        if not gradient:
+            return price
+
+        vega = sum(dC_dsigma_list) / iterations
+        d_forward = sum(dC_dF_list) / iterations + vega * d_sigma["forward"]
+
+        d_forward_rate = ibor_curve.forward_rate_gradient(expiry, expiry + accrual)
+
+        return price, {
+            "ois": price / df * ois_curve.df_gradient(expiry),
+            "3m": d_forward * d_forward_rate,
+            "vol": {key: vega * d_params for key, d_params in d_sigma["sabr"].items()}
+        }
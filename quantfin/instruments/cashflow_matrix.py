@@ -0,0 +1,95 @@
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+from quantfin.instruments.ois_future import OISFuture
+from quantfin.instruments.ois_swap import OISSwap
+from quantfin.instruments.swap_3m import Swap3M
+
+
+class CashflowMatrix:
+    """
+    Compiled form of a set of curve calibration instruments. Every residual (PV for swaps, price minus market price
+    for futures) is written over one unique date grid as
+
+        residual = constant + df_weights @ D(times) + forward_weights @ (D(starts) / D(ends) - 1)
+
+    where D is the curve being calibrated and both weight matrices are sparse. Compile once with the instruments
+    (and the OIS discount curve for 3m swaps), then evaluate against as many curves as needed.
+    """
+
+    def __init__(self, instruments, ois_curve=None):
+        self.instruments = list(instruments)
+
+        constant = np.zeros(len(self.instruments))
+        df_entries = []       # (row, time, weight)
+        forward_entries = []  # (row, start, end, weight)
+
+        for row, instrument in enumerate(self.instruments):
+            if isinstance(instrument, OISFuture):
+                constant[row] = instrument.notional - instrument.market_price
+                forward_entries.append((row, instrument.maturity, instrument.maturity + instrument.accrual, -instrument.notional / instrument.accrual))
+            elif isinstance(instrument, OISSwap):
+                schedule = np.arange(instrument.freq, instrument.maturity + 1e-12, instrument.freq)
+                constant[row] = instrument.notional
+                df_entries.append((row, instrument.maturity, -instrument.notional))
+                df_entries.extend((row, time, -instrument.notional * instrument.fixed_rate * instrument.freq) for time in schedule)
+            elif isinstance(instrument, Swap3M):
+                if ois_curve is None:
+                    raise Exception("Instrument " + instrument.__class__.__name__ + " needs an OIS curve to compile")
+                schedule = np.arange(instrument.freq, instrument.maturity + 1e-12, instrument.freq)
+                discount_factors = ois_curve.df(schedule)
+                constant[row] = -instrument.notional * instrument.fixed_rate * instrument.freq * np.sum(discount_factors)
+                forward_entries.extend(
+                    (row, time - instrument.freq, time, instrument.notional * discount_factor)
+                    for time, discount_factor in zip(schedule, discount_factors)
+                )
+            else:
+                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported for cashflow compilation")
+
+        df_times = [time for _, time, _ in df_entries]
+        forward_starts = [start for _, start, _, _ in forward_entries]
+        forward_ends = [end for _, _, end, _ in forward_entries]
+        self.times = np.unique(np.array(df_times + forward_starts + forward_ends, dtype=float))
+
+        pairs = np.unique(np.array([forward_starts, forward_ends], dtype=float).reshape(2, -1).T, axis=0)
+        self.start_index = np.searchsorted(self.times, pairs[:, 0])
+        self.end_index = np.searchsorted(self.times, pairs[:, 1])
+
+        shape = (len(self.instruments), len(self.times))
+        self.constant = constant
+        self.df_weights = csr_matrix(
+            ([weight for _, _, weight in df_entries], ([row for row, _, _ in df_entries], np.searchsorted(self.times, df_times))),
+            shape=shape
+        )
+
+        pair_index = {(start, end): i for i, (start, end) in enumerate(pairs.tolist())}
+        self.forward_weights = csr_matrix(
+            (
+                [weight for _, _, _, weight in forward_entries],
+                ([row for row, _, _, _ in forward_entries], [pair_index[(start, end)] for _, start, end, _ in forward_entries])
+            ),
+            shape=(len(self.instruments), len(pairs))
+        )
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def residuals(self, curve):
+        dfs = curve.df(self.times)
+        forwards = dfs[self.start_index] / dfs[self.end_index] - 1
+
+        return self.constant + self.df_weights @ dfs + self.forward_weights @ forwards
+
+    def jacobian(self, curve, sparse=False):
+        # derivatives of the residuals with respect to the curve model parameters, a csr matrix if sparse
+        dfs = curve.df(self.times)
+        d_dfs = curve.df_gradient(self.times, sparse=sparse)
+        start_dfs, end_dfs = dfs[self.start_index], dfs[self.end_index]
+
+        if sparse:
+            d_forwards = diags(1 / end_dfs) @ d_dfs[self.start_index] - diags(start_dfs / end_dfs ** 2) @ d_dfs[self.end_index]
+            return (self.df_weights @ d_dfs + self.forward_weights @ d_forwards).tocsr()
+
+        d_forwards = d_dfs[self.start_index] / end_dfs[:, None] - (start_dfs / end_dfs ** 2)[:, None] * d_dfs[self.end_index]
+
+        return self.df_weights @ d_dfs + self.forward_weights @ d_forwards
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def forward_swap_rates_and_annuities(ois_curve, ibor_curve, expiries, tenors, accrual=0.25):
+    """
+    Forward swap rates and annuities of 3m swaps starting at each expiry for each tenor, on the same schedules as
+    Swaption3M. The schedules of all swaps are laid out on one padded grid and every distinct date is looked up on
+    the curves once, however many swaps share it.
+    """
+    expiries, tenors = np.broadcast_arrays(np.asarray(expiries, dtype=float), np.asarray(tenors, dtype=float))
+    starts = expiries.reshape(-1) + accrual
+    stops = expiries.reshape(-1) + tenors.reshape(-1) + 1e-12
+    # same length np.arange gives each schedule
+    counts = np.maximum(np.ceil((stops - starts) / accrual), 0).astype(int)
+
+    periods = np.arange(counts.max() if len(counts) else 0)
+    mask = periods < counts[:, None]
+    schedules = starts[:, None] + periods * accrual
+
+    dates, inverse = np.unique(schedules[mask], return_inverse=True)
+    dfs = np.zeros(schedules.shape)
+    forward_rates = np.zeros(schedules.shape)
+    dfs[mask] = np.asarray(ois_curve.df(dates)).reshape(-1)[inverse]
+    forward_rates[mask] = np.asarray(ibor_curve.forward_rate(dates - accrual, dates)).reshape(-1)[inverse]
+
+    annuities = np.sum(accrual * dfs, axis=1)
+    rates = np.sum(accrual * forward_rates * dfs, axis=1) / annuities
+
+    return rates.reshape(expiries.shape), annuities.reshape(expiries.shape)
+
+
+class ForwardSwapRateCache:
+    """
+    Forward swap rate and annuity per (expiry, tenor) for one OIS / 3m curve pair, shared by the swaption vol
+    calibration and pricing. prepare() fills many keys in one vectorised pass; values are dropped if either
+    curve model's version changes.
+    """
+
+    def __init__(self, ois_curve, ibor_curve, accrual=0.25):
+        self.ois_curve = ois_curve
+        self.ibor_curve = ibor_curve
+        self.accrual = accrual
+        self.values = {}
+        self.versions = self.curve_versions()
+
+    def curve_versions(self):
+        return getattr(self.ois_curve.curve_model, "version", 0), getattr(self.ibor_curve.curve_model, "version", 0)
+
+    def prepare(self, keys):
+        versions = self.curve_versions()
+        if versions != self.versions:
+            self.values.clear()
+            self.versions = versions
+
+        missing = [key for key in dict.fromkeys(keys) if key not in self.values]
+        if missing:
+            expiries, tenors = zip(*missing)
+            rates, annuities = forward_swap_rates_and_annuities(self.ois_curve, self.ibor_curve, expiries, tenors, self.accrual)
+            self.values.update(zip(missing, zip(rates.tolist(), annuities.tolist())))
+
+    def get(self, expiry, tenor):
+        """Return (forward swap rate, annuity)"""
+        self.prepare([(expiry, tenor)])
+        return self.values[(expiry, tenor)]
@@ -9,6 +9,14 @@ class OISFuture:
     def market_rate(self):
         return 1 - self.market_price
 
-    def price(self, ois_curve):
+    def price(self, ois_curve, gradient=False):
         forward_rate = (ois_curve.df(self.maturity) / ois_curve.df(self.maturity + self.accrual) - 1) / self.accrual
-        return self.notional * (1 - forward_rate)
+        price = self.notional * (1 - forward_rate)
+
+        if not gradient:
+            return price
+
+        # derivative of the price with respect to the OIS curve model parameters
+        d_forward_rate = ois_curve.forward_rate_gradient(self.maturity, self.maturity + self.accrual)
+
+        return price, {"ois": -self.notional * d_forward_rate}
@@ -7,8 +7,17 @@ class OISSwap:
         self.notional = notional
         self.freq = 0.5
 
-    def price(self, ois_curve):
+    def price(self, ois_curve, gradient=False):
         schedule = np.arange(self.freq, self.maturity + 1e-12, self.freq)
-        pv_fixed = sum(self.fixed_rate * self.freq * ois_curve.df(time) for time in schedule)
+        pv_fixed = self.fixed_rate * self.freq * np.sum(ois_curve.df(schedule))
         pv_float = 1 - ois_curve.df(self.maturity)
-        return self.notional * (pv_float - pv_fixed)
+        price = self.notional * (pv_float - pv_fixed)
+
+        if not gradient:
+            return price
+
+        # derivative of the price with respect to the OIS curve model parameters
+        d_pv_fixed = self.fixed_rate * self.freq * np.sum(ois_curve.df_gradient(schedule), axis=0)
+        d_pv_float = -ois_curve.df_gradient(self.maturity)
+
+        return price, {"ois": self.notional * (d_pv_float - d_pv_fixed)}
@@ -7,8 +7,22 @@ class Swap3M:
         self.notional = notional
         self.freq = 0.25
 
-    def price(self, ois_curve, curve3m):
+    def price(self, ois_curve, curve3m, gradient=False):
         schedule = np.arange(self.freq, self.maturity + 1e-12, self.freq)
-        pv_fixed = sum(self.fixed_rate * self.freq * ois_curve.df(time) for time in schedule)
-        pv_float = sum(curve3m.forward_rate(time - self.freq, time) * self.freq * ois_curve.df(time) for time in schedule)
-        return self.notional * (pv_float - pv_fixed)
+        dfs = ois_curve.df(schedule)
+        forward_rates = curve3m.forward_rate(schedule - self.freq, schedule)
+        pv_fixed = self.fixed_rate * self.freq * np.sum(dfs)
+        pv_float = np.sum(forward_rates * self.freq * dfs)
+        price = self.notional * (pv_float - pv_fixed)
+
+        if not gradient:
+            return price
+
+        # derivatives of the price with respect to the OIS and 3m curve model parameters
+        d_dfs = ois_curve.df_gradient(schedule)
+        d_ois = (forward_rates * self.freq - self.fixed_rate * self.freq) @ d_dfs
+
+        d_forward_rates = curve3m.forward_rate_gradient(schedule - self.freq, schedule)
+        d_3m = (self.freq * dfs) @ d_forward_rates
+
+        return price, {"ois": self.notional * d_ois, "3m": self.notional * d_3m}
@@ -0,0 +1,70 @@
+import numpy as np
+
+from quantfin.instruments.ois_swap import OISSwap
+from quantfin.instruments.swap_3m import Swap3M
+
+
+class SwapPortfolio:
+    """
+    Columnar book of OIS and 3m swaps, held as arrays of maturity, fixed rate, notional and fixed leg frequency.
+    price() values the whole book at once: for each frequency the curves are looked up once on a date grid out
+    to the longest maturity, and every trade sums its legs over its prefix of that shared grid. Prefix sums are
+    taken once per distinct schedule length with np.sum, the same pairwise summation as the per trade price, so
+    the PVs agree exactly.
+    """
+
+    def __init__(self, maturities, fixed_rates, notionals, freqs, is_ois):
+        self.maturities = np.asarray(maturities, dtype=float)
+        self.fixed_rates = np.asarray(fixed_rates, dtype=float)
+        self.notionals = np.asarray(notionals, dtype=float)
+        self.freqs = np.asarray(freqs, dtype=float)
+        self.is_ois = np.asarray(is_ois, dtype=bool)
+
+    @classmethod
+    def from_instruments(cls, instruments):
+        for instrument in instruments:
+            if not isinstance(instrument, (OISSwap, Swap3M)):
+                raise Exception("Instrument " + instrument.__class__.__name__ + " is not supported in a swap portfolio")
+
+        return cls(
+            [instrument.maturity for instrument in instruments],
+            [instrument.fixed_rate for instrument in instruments],
+            [instrument.notional for instrument in instruments],
+            [instrument.freq for instrument in instruments],
+            [isinstance(instrument, OISSwap) for instrument in instruments]
+        )
+
+    def __len__(self):
+        return len(self.maturities)
+
+    def price(self, ois_curve, curve3m=None):
+        """PV of every trade, in the same order as the book"""
+        if curve3m is None and not np.all(self.is_ois):
+            raise Exception("3m swaps in the portfolio need a 3m curve to price")
+
+        pvs = np.zeros(len(self))
+
+        for freq in np.unique(self.freqs):
+            trades = self.freqs == freq
+            maturities = self.maturities[trades]
+            grid = np.arange(freq, maturities.max() + 1e-12, freq)
+            # number of grid dates in each trade's schedule, same dates as the per trade arange
+            counts = np.searchsorted(grid, maturities + 1e-12)
+
+            dfs = ois_curve.df(grid)
+            lengths, length_index = np.unique(counts, return_inverse=True)
+            df_sums = np.array([np.sum(dfs[:length]) for length in lengths])[length_index]
+            pv_fixed = self.fixed_rates[trades] * freq * df_sums
+
+            is_ois = self.is_ois[trades]
+            pv_float = np.zeros(len(maturities))
+            if np.any(is_ois):
+                pv_float[is_ois] = 1 - ois_curve.df(maturities[is_ois])
+            if not np.all(is_ois):
+                float_cashflows = curve3m.forward_rate(grid - freq, grid) * freq * dfs
+                float_legs = np.array([np.sum(float_cashflows[:length]) for length in lengths])[length_index]
+                pv_float[~is_ois] = float_legs[~is_ois]
+
+            pvs[trades] = self.notionals[trades] * (pv_float - pv_fixed)
+
+        return pvs
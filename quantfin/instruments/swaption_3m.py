@@ -13,28 +13,68 @@ class Swaption3M:
         self.market_vol = market_vol
         self.accrual = 0.25
 
-    def forward_swap_rate(self, ois_curve, ibor_curve):
+    def forward_swap_rate(self, ois_curve, ibor_curve, swap_rate_cache=None):
+        if swap_rate_cache is not None:
+            return self.cached_swap_rate_and_annuity(ois_curve, ibor_curve, swap_rate_cache)[0]
+
         schedule = np.arange(self.expiry + self.accrual, self.expiry + self.tenor + 1e-12, self.accrual)
-        denominator = sum(self.accrual * ois_curve.df(time) for time in schedule)
-        numerator = sum(self.accrual * ibor_curve.forward_rate(time - self.accrual, time) * ois_curve.df(time) for time in schedule)
+        dfs = ois_curve.df(schedule)
+        denominator = np.sum(self.accrual * dfs)
+        numerator = np.sum(self.accrual * ibor_curve.forward_rate(schedule - self.accrual, schedule) * dfs)
         return numerator / denominator
 
-    def price(self, ois_curve, ibor_curve, vol_surface):
+    def cached_swap_rate_and_annuity(self, ois_curve, ibor_curve, swap_rate_cache):
+        if swap_rate_cache.ois_curve is not ois_curve or swap_rate_cache.ibor_curve is not ibor_curve:
+            raise ValueError("Forward swap rate cache was built for a different curve pair")
+        if swap_rate_cache.accrual != self.accrual:
+            raise ValueError(f"Forward swap rate cache uses accrual {swap_rate_cache.accrual}, swaption uses {self.accrual}")
+        return swap_rate_cache.get(self.expiry, self.tenor)
+
+    def price(self, ois_curve, ibor_curve, vol_surface, gradient=False, swap_rate_cache=None):
+        """swap_rate_cache is an optional ForwardSwapRateCache on the same curves, shared across swaptions"""
         expiry = self.expiry
         strike = self.strike
         tenor = self.tenor
-        forward_swap_rate = self.forward_swap_rate(ois_curve, ibor_curve)
         accrual = self.accrual
         notional = self.notional
 
-        schedule = np.arange(expiry + accrual, expiry + tenor + 1e-12, accrual)
-        annuity = sum(accrual * ois_curve.df(time) for time in schedule)
+        if swap_rate_cache is not None:
+            forward_swap_rate, annuity = self.cached_swap_rate_and_annuity(ois_curve, ibor_curve, swap_rate_cache)
+        else:
+            schedule = np.arange(expiry + accrual, expiry + tenor + 1e-12, accrual)
+            forward_swap_rate = self.forward_swap_rate(ois_curve, ibor_curve)
+            annuity = np.sum(accrual * ois_curve.df(schedule))
         # sigma = 0.2 # TODO: Actually build a swaption vol surface
-        sigma = vol_surface.get_vol(expiry, tenor, strike, forward_swap_rate)
+        if gradient:
+            sigma, d_sigma = vol_surface.get_vol(expiry, tenor, strike, forward_swap_rate, gradient=True)
+        else:
+            sigma = vol_surface.get_vol(expiry, tenor, strike, forward_swap_rate)
 
         d_1 = (math.log(forward_swap_rate / strike) + (sigma ** 2) * expiry / 2) / (sigma * math.sqrt(expiry))
         d_2 = d_1 - sigma * math.sqrt(expiry)
 
         price = notional * annuity * (forward_swap_rate * norm.cdf(d_1) - strike * norm.cdf(d_2))
 
-        return price
+        if not gradient:
+            return price
+
+        # adjoints of the price back through the vol, the forward swap rate and the annuity
+        vega = notional * annuity * forward_swap_rate * norm.pdf(d_1) * math.sqrt(expiry)
+        d_forward_swap_rate = notional * annuity * norm.cdf(d_1) + vega * d_sigma["forward"]
+        d_annuity = price / annuity
+
+        schedule = np.arange(expiry + accrual, expiry + tenor + 1e-12, accrual)
+        dfs = ois_curve.df(schedule)
+        forward_rates = ibor_curve.forward_rate(schedule - accrual, schedule)
+        d_dfs = ois_curve.df_gradient(schedule)
+        d_annuity_ois = accrual * np.sum(d_dfs, axis=0)
+        d_swap_rate_ois = (accrual * forward_rates @ d_dfs - forward_swap_rate * d_annuity_ois) / annuity
+
+        d_forward_rates = ibor_curve.forward_rate_gradient(schedule - accrual, schedule)
+        d_swap_rate_3m = (accrual * dfs) @ d_forward_rates / annuity
+
+        return price, {
+            "ois": d_annuity * d_annuity_ois + d_forward_swap_rate * d_swap_rate_ois,
+            "3m": d_forward_swap_rate * d_swap_rate_3m,
+            "vol": {key: vega * d_params for key, d_params in d_sigma["sabr"].items()}
+        }
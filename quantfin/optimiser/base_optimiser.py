@@ -1,8 +1,24 @@
 import numpy as np
 
+
+def warm_start(x0, previous_params, default):
+    # a previous fit wins over the explicit guess, which wins over the default
+    if previous_params is not None:
+        return np.array(previous_params, dtype=float)
+    if x0 is not None:
+        return np.array(x0, dtype=float)
+    return np.array(default, dtype=float)
+
+
 class BaseOptimiser:
+    # number of iterations taken by the last optimise() call
+    iterations = 0
+
+    def jacobian(self, x, residuals, args, safe_params=None, bump=1e-6, jac=None):
+        # analytic jacobian if the caller supplies one, same call convention as the residuals
+        if jac is not None:
+            return jac(x, *args)
 
-    def jacobian(self, x, residuals, args, safe_params=None, bump=1e-6):
         if safe_params is None:
             def safe_params(y):
                 return y
@@ -20,5 +36,5 @@ class BaseOptimiser:
 
         return jacobian
 
-    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6):
+    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6, jac=None):
         pass
\ No newline at end of file
@@ -3,14 +3,17 @@ import numpy as np
 from quantfin.optimiser.base_optimiser import BaseOptimiser
 
 class GaussNewtonOptimiser(BaseOptimiser):
-    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6):
+    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6, jac=None):
         x = x0
 
+        self.iterations = 0
+
         for k in range(max_iter):
+            self.iterations = k + 1
             r = residuals(x, *args)
             print(f"Iter {k}: ||r|| = {np.linalg.norm(r):.4e}, x = {x}")
 
-            J = self.jacobian(x, residuals, args, safe_params)
+            J = self.jacobian(x, residuals, args, safe_params, jac=jac)
 
             p = -np.linalg.inv(J.T @ J) @ (J.T @ r)
 
@@ -14,12 +14,12 @@ class SQPOptimiser(BaseOptimiser):
         residuals = residuals(x, *args)
         return 0.5 * np.dot(residuals, residuals)
 
-    def gradient_objective(self, params, residuals, args):
-        # Finite difference calculation of scalar objective
+    def gradient_objective(self, params, residuals, args, jac=None):
+        # Gradient of scalar objective, finite difference unless an analytic jacobian is supplied
         x = params
 
         r = residuals(x, *args)
-        J = self.jacobian(x, residuals, args)
+        J = self.jacobian(x, residuals, args, jac=jac)
         grad = J.T @ r
 
         return grad
@@ -40,22 +40,25 @@ class SQPOptimiser(BaseOptimiser):
 
         return p, lam
 
-    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6):
+    def optimise(self, x0, residuals, args, safe_params=None, constraints=None, gradient_constraints=None, max_iter=100, tol=1e-6, jac=None):
         x = x0.copy()
         lam = 1e-2
         nu = 10
 
+        self.iterations = 0
+
         for k in range(max_iter):
+            self.iterations = k + 1
             f0 = self.objective(x, residuals, args)
             print(f"Iter {k}: x = {x}, f ={f0:.4f}")
 
             # Gradients
-            grad = self.gradient_objective(x, residuals, args)
+            grad = self.gradient_objective(x, residuals, args, jac)
 
             A = gradient_constraints()[constraints(x) >= -1e-3]
             c = constraints(x)[constraints(x) >= -1e-3]
 
-            J = self.jacobian(x, residuals, args)
+            J = self.jacobian(x, residuals, args, jac=jac)
             H = J.T @ J
 
             # empirically good step size here, can probably do better in justifying
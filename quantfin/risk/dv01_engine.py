@@ -0,0 +1,148 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from quantfin.curves.curve import Curve
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.instruments.caplet_3m import Caplet3M
+from quantfin.instruments.forward_swap_rates import ForwardSwapRateCache
+from quantfin.instruments.ois_future import OISFuture
+from quantfin.instruments.swap_3m import Swap3M
+from quantfin.instruments.swaption_3m import Swaption3M
+
+# portfolio and vol surfaces shipped once to each worker process rather than with every bump
+WORKER_STATE = {}
+
+
+def portfolio_pvs(portfolio, curves, caplet_vol_surface=None, swaption_vol_surface=None):
+    ois_curve, ibor_curve = curves["ois"], curves["3m"]
+    # swaptions on the same (expiry, tenor) share one forward swap rate and annuity per curve pair
+    swap_rate_cache = ForwardSwapRateCache(ois_curve, ibor_curve)
+
+    def pv(trade):
+        if isinstance(trade, Swap3M):
+            return trade.price(ois_curve, ibor_curve)
+        elif isinstance(trade, Caplet3M):
+            return trade.price(ois_curve, ibor_curve, caplet_vol_surface)
+        elif isinstance(trade, Swaption3M):
+            return trade.price(ois_curve, ibor_curve, swaption_vol_surface, swap_rate_cache=swap_rate_cache)
+        else:
+            raise Exception("Trade " + trade.__class__.__name__ + " is not supported for DV01")
+
+    return np.array([pv(trade) for trade in portfolio])
+
+
+def init_worker(portfolio, caplet_vol_surface, swaption_vol_surface, model, calibration_engine):
+    WORKER_STATE.update(
+        portfolio=portfolio,
+        caplet_vol_surface=caplet_vol_surface,
+        swaption_vol_surface=swaption_vol_surface,
+        model=model,
+        calibration_engine=calibration_engine
+    )
+
+
+def revalue_par_bump(quote_set):
+    # rebuild both curves from one bumped quote set and revalue the portfolio
+    ois_instruments, swaps3m = quote_set
+    curves = CurveManager().build(ois_instruments, swaps3m, WORKER_STATE["model"], WORKER_STATE["calibration_engine"])
+    return portfolio_pvs(WORKER_STATE["portfolio"], curves, WORKER_STATE["caplet_vol_surface"], WORKER_STATE["swaption_vol_surface"])
+
+
+def revalue_key_rate_bump(bumped_curves):
+    return portfolio_pvs(WORKER_STATE["portfolio"], bumped_curves, WORKER_STATE["caplet_vol_surface"], WORKER_STATE["swaption_vol_surface"])
+
+
+class DV01Engine:
+    """
+    Bucketed DV01s by bump and rebuild around CurveManager. "par" mode bumps each market quote in turn by one
+    bump (rate terms, so OIS future prices go down) and rebuilds both curves; "key_rate" mode bumps the zero rate
+    of each knot of a bootstrapped OIS or 3m curve, with the other curve held. Bumped curves are built and the
+    portfolio revalued over a process pool. DV01s are scaled to a 1bp move.
+    """
+
+    def __init__(self, ois_instruments, swaps3m, model="log_linear_bootstrapped", calibration_engine="scipy", bump=1e-4, method="central", max_workers=None, chunksize=1):
+        if method not in ("central", "one_sided"):
+            raise ValueError(f"DV01 method {method} is not supported")
+
+        self.ois_instruments = list(ois_instruments)
+        self.swaps3m = list(swaps3m)
+        self.model = model
+        self.calibration_engine = calibration_engine
+        self.bump = bump
+        self.method = method
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    @staticmethod
+    def bump_instrument(instrument, bump):
+        if isinstance(instrument, OISFuture):
+            return instrument.__class__(instrument.maturity, instrument.market_price - bump, instrument.notional)
+        return instrument.__class__(instrument.maturity, instrument.fixed_rate + bump, instrument.notional)
+
+    def par_buckets(self):
+        return [("ois", instrument.__class__.__name__, instrument.maturity) for instrument in self.ois_instruments] + \
+            [("3m", swap.__class__.__name__, swap.maturity) for swap in self.swaps3m]
+
+    def par_quote_sets(self, bump):
+        instruments = self.ois_instruments + self.swaps3m
+        ois_count = len(self.ois_instruments)
+        quote_sets = []
+
+        for i in range(len(instruments)):
+            bumped = list(instruments)
+            bumped[i] = self.bump_instrument(bumped[i], bump)
+            quote_sets.append((bumped[:ois_count], bumped[ois_count:]))
+
+        return quote_sets
+
+    @staticmethod
+    def key_rate_curves(curves, bump):
+        bumped_curves = []
+
+        for name in ["ois", "3m"]:
+            curve_model = curves[name].curve_model
+            if not isinstance(curve_model, LogLinearBootstrappedCurveModel):
+                raise ValueError("Key rate DV01 needs log_linear_bootstrapped curves")
+
+            for k in range(1, len(curve_model.times)):
+                dfs = list(curve_model.dfs)
+                dfs[k] = dfs[k] * np.exp(-bump * curve_model.times[k])
+                bumped = dict(curves)
+                bumped[name] = Curve(LogLinearBootstrappedCurveModel(curve_model.times, dfs))
+                bumped_curves.append(bumped)
+
+        return bumped_curves
+
+    def compute(self, portfolio, caplet_vol_surface=None, swaption_vol_surface=None, mode="par"):
+        """Return {"buckets": bucket labels, "dv01": bucket x trade matrix of PV changes per 1bp}"""
+        base_curves = CurveManager().build(self.ois_instruments, self.swaps3m, self.model, self.calibration_engine)
+
+        if mode == "par":
+            buckets = self.par_buckets()
+            worker, up_tasks, down_tasks = revalue_par_bump, self.par_quote_sets(self.bump), self.par_quote_sets(-self.bump)
+        elif mode == "key_rate":
+            buckets = [(name, "knot", t) for name in ["ois", "3m"] for t in base_curves[name].curve_model.times[1:]]
+            worker, up_tasks, down_tasks = revalue_key_rate_bump, self.key_rate_curves(base_curves, self.bump), self.key_rate_curves(base_curves, -self.bump)
+        else:
+            raise ValueError(f"DV01 mode {mode} is not supported")
+
+        tasks = up_tasks + (down_tasks if self.method == "central" else [])
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=init_worker,
+            initargs=(portfolio, caplet_vol_surface, swaption_vol_surface, self.model, self.calibration_engine)
+        ) as executor:
+            pvs = np.array(list(executor.map(worker, tasks, chunksize=self.chunksize)))
+
+        up_pvs = pvs[:len(up_tasks)]
+        if self.method == "central":
+            change = (up_pvs - pvs[len(up_tasks):]) / 2
+        else:
+            change = up_pvs - portfolio_pvs(portfolio, base_curves, caplet_vol_surface, swaption_vol_surface)
+
+        return {
+            "buckets": buckets,
+            "dv01": change * (1e-4 / self.bump)
+        }
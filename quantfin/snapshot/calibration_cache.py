@@ -0,0 +1,138 @@
+"""
+Content addressed cache of calibration results. Each entry is keyed on a sha256 fingerprint of everything that
+determines the fit (quotes, forwards, engine, model settings), so an unchanged slice or curve on a rerun is a hit
+whatever date or process produced it. Entries live in memory and, if a path is given, in a JSON file that is
+read on construction and rewritten by save().
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from quantfin.curves.curve import Curve
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+
+
+def fingerprint(*parts):
+    def default(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Cannot fingerprint {value.__class__.__name__}")
+
+    # floats are written with repr, so any change in a quote changes the key
+    return hashlib.sha256(json.dumps(parts, default=default, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def curve_to_state(curve):
+    curve_model = curve.curve_model
+    if isinstance(curve_model, LogLinearBootstrappedCurveModel):
+        return {"model": "log_linear_bootstrapped", "times": [float(t) for t in curve_model.times], "dfs": [float(df) for df in curve_model.dfs]}
+    elif isinstance(curve_model, NelsonSiegelCurveModel):
+        return {"model": "nelson_siegel", "params": [float(curve_model.beta0), float(curve_model.beta1), float(curve_model.beta2), float(curve_model.tau)]}
+    else:
+        raise ValueError(f"Curve model {curve_model.__class__.__name__} is not supported in the calibration cache")
+
+
+def curve_from_state(state):
+    if state["model"] == "log_linear_bootstrapped":
+        return Curve(LogLinearBootstrappedCurveModel(state["times"], state["dfs"]))
+    elif state["model"] == "nelson_siegel":
+        return Curve(NelsonSiegelCurveModel(*state["params"]))
+    else:
+        raise ValueError(f"Curve model {state['model']} is not supported in the calibration cache")
+
+
+class CalibrationCache:
+    """
+    Fitted parameters keyed by fingerprint. Least recently used entries are evicted beyond max_entries, and
+    entries older than max_age seconds are treated as misses and dropped. save() only writes the file when entries
+    were added or dropped since it was loaded or last saved, and merges in entries other processes saved meanwhile.
+    """
+
+    def __init__(self, path=None, max_entries=None, max_age=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+        self.entries = self.load()
+        self.evict()
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return OrderedDict()
+
+        with open(self.path, "r") as f:
+            return OrderedDict(json.load(f))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def evict(self):
+        if self.max_age is not None:
+            now = time.time()
+            for key in [key for key, entry in self.entries.items() if now - entry["created"] > self.max_age]:
+                del self.entries[key]
+                self.dirty = True
+
+        while self.max_entries is not None and len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.dirty = True
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and self.max_age is not None and time.time() - entry["created"] > self.max_age:
+            del self.entries[key]
+            self.dirty = True
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry["value"]
+
+    def put(self, key, value):
+        # value must be JSON serialisable
+        self.entries[key] = {"created": time.time(), "value": value}
+        self.entries.move_to_end(key)
+        self.dirty = True
+        self.evict()
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+
+        # entries saved by other processes since this one loaded are kept, ours are the most recently used. A
+        # process saving between our load and replace can still lose its entries, the window is one JSON write
+        entries = self.load()
+        for key, entry in self.entries.items():
+            entries.pop(key, None)
+            entries[key] = entry
+        self.entries = entries
+        self.evict()
+
+        # written to a uniquely named file next to the target and swapped in, so a crash never leaves a half
+        # written cache and processes saving at the same time never write into each other's temporary file
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        self.dirty = False
@@ -0,0 +1,158 @@
+"""
+Binary snapshot of built curves and calibrated vol surfaces.
+
+Layout (little endian):
+    8 bytes   magic b"QFSNAP\\0\\0"
+    4 bytes   format version (uint32)
+    4 bytes   header length in bytes (uint32)
+    header    UTF-8 JSON describing each curve/surface and where its arrays live in the data block
+    padding   up to an 8 byte boundary
+    data      contiguous float64 arrays
+
+The data block is memory-mapped on load, so every worker reading the same file shares the pages and only the
+header is parsed. Curve interpolators, expiry indexes and vol cubes are built straight over views into the map,
+the per slice VolModels are only created if a surface's models are asked for.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from quantfin.curves.curve import Curve
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+from quantfin.vol.caplet3m_vol_surface import Caplet3MVolSurface
+from quantfin.vol.expiry_index import ExpiryIndex
+from quantfin.vol.swaption3m_vol_cube import Swaption3MVolCube
+from quantfin.vol.swaption3m_vol_surface import Swaption3MVolSurface
+from quantfin.vol.vol_surface import VolSurface
+
+SNAPSHOT_MAGIC = b"QFSNAP\0\0"
+SNAPSHOT_VERSION = 1
+
+SURFACE_TYPES = {
+    "vol_surface": VolSurface,
+    "caplet3m": Caplet3MVolSurface,
+    "swaption3m": Swaption3MVolSurface
+}
+
+
+class MarketSnapshot:
+    """Curves and vol surfaces restored from a snapshot file, backed by a read-only memory map"""
+
+    def __init__(self, version, curves, vol_surfaces, data):
+        self.version = version
+        self.curves = curves
+        self.vol_surfaces = vol_surfaces
+        self.data = data
+
+
+def save_snapshot(path, curves=None, vol_surfaces=None):
+    curves = curves if curves is not None else {}
+    vol_surfaces = vol_surfaces if vol_surfaces is not None else {}
+    arrays = []
+    offset = 0
+
+    def add_array(values):
+        nonlocal offset
+        values = np.ascontiguousarray(values, dtype="<f8")
+        arrays.append(values)
+        location = [offset, len(values)]
+        offset += len(values)
+        return location
+
+    header = {"curves": {}, "vol_surfaces": {}, "data_length": 0}
+
+    for name, curve in curves.items():
+        curve_model = curve.curve_model
+        if isinstance(curve_model, LogLinearBootstrappedCurveModel):
+            header["curves"][name] = {
+                "model": "log_linear_bootstrapped",
+                "times": add_array(curve_model.times),
+                "dfs": add_array(curve_model.dfs)
+            }
+        elif isinstance(curve_model, NelsonSiegelCurveModel):
+            header["curves"][name] = {
+                "model": "nelson_siegel",
+                "params": add_array([curve_model.beta0, curve_model.beta1, curve_model.beta2, curve_model.tau])
+            }
+        else:
+            raise ValueError(f"Curve model {curve_model.__class__.__name__} is not supported in snapshots")
+
+    for name, surface in vol_surfaces.items():
+        surface_type = next((key for key, cls in SURFACE_TYPES.items() if type(surface) is cls), None)
+        if surface_type is None:
+            raise ValueError(f"Vol surface {surface.__class__.__name__} is not supported in snapshots")
+
+        keys = sorted(surface.models.keys())
+        models = [surface.models[key] for key in keys]
+        entry = {"type": surface_type}
+
+        if surface_type == "swaption3m":
+            entry["expiries"] = add_array([expiry for expiry, _ in keys])
+            entry["tenors"] = add_array([tenor for _, tenor in keys])
+        else:
+            entry["expiries"] = add_array(keys)
+
+        entry["alpha"] = add_array([model.alpha for model in models])
+        entry["rho"] = add_array([model.rho for model in models])
+        entry["nu"] = add_array([model.nu for model in models])
+        header["vol_surfaces"][name] = entry
+
+    header["data_length"] = offset
+    header_bytes = json.dumps(header).encode("utf-8")
+    padding = -(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)) % 8
+
+    with open(path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<II", SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        for values in arrays:
+            f.write(values.tobytes())
+
+
+def load_snapshot(path):
+    with open(path, "rb") as f:
+        magic = f.read(len(SNAPSHOT_MAGIC))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a quantfin snapshot")
+
+        version, header_length = struct.unpack("<II", f.read(8))
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {version} is not supported, expected {SNAPSHOT_VERSION}")
+
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    data_offset = len(SNAPSHOT_MAGIC) + 8 + header_length
+    data_offset += -data_offset % 8
+    data_length = header["data_length"]
+    data = np.memmap(path, dtype="<f8", mode="r", offset=data_offset, shape=(data_length,)) if data_length else np.empty(0)
+
+    def array(location):
+        start, length = location
+        return data[start:start + length]
+
+    curves = {}
+    for name, entry in header["curves"].items():
+        if entry["model"] == "log_linear_bootstrapped":
+            curves[name] = Curve(LogLinearBootstrappedCurveModel(array(entry["times"]), array(entry["dfs"])))
+        elif entry["model"] == "nelson_siegel":
+            curves[name] = Curve(NelsonSiegelCurveModel(*array(entry["params"]).tolist()))
+        else:
+            raise ValueError(f"Curve model {entry['model']} is not supported in snapshots")
+
+    vol_surfaces = {}
+    for name, entry in header["vol_surfaces"].items():
+        surface = SURFACE_TYPES[entry["type"]]()
+        expiries, alpha, rho, nu = (array(entry[key]) for key in ["expiries", "alpha", "rho", "nu"])
+        if len(expiries):
+            if entry["type"] == "swaption3m":
+                surface.vol_cube = Swaption3MVolCube.from_arrays(expiries, array(entry["tenors"]), alpha, rho, nu, surface.interpolation)
+            else:
+                surface.expiry_index = ExpiryIndex.from_arrays(expiries, alpha, rho, nu)
+            surface.models = None
+        vol_surfaces[name] = surface
+
+    return MarketSnapshot(version, curves, vol_surfaces, data)
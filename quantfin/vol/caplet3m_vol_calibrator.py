@@ -7,6 +7,8 @@ class Caplet3MVolCalibrator:
     def __init__(self, caplets, ibor_curve):
         self.caplets = caplets
         self.ibor_curve = ibor_curve
+        self.iterations = 0
+        self.evaluations = 0
 
     def extract_vol_data(self):
         # Extract data from caplets into a form we can pass into the base VolCalibrator
@@ -23,9 +25,12 @@ class Caplet3MVolCalibrator:
 
         return expiries, strikes, market_vols, forwards
 
-    def calibrate(self, engine="scipy"):
+    def calibrate(self, engine="scipy", x0=None, previous=None):
         expiries, strikes, market_vols, forwards = self.extract_vol_data()
 
         base_calibrator = VolCalibrator(expiries, strikes, market_vols, forwards)
+        model = base_calibrator.calibrate(engine=engine, x0=x0, previous=previous)
+        self.iterations = base_calibrator.iterations
+        self.evaluations = base_calibrator.evaluations
 
-        return base_calibrator.calibrate(engine=engine)
\ No newline at end of file
+        return model
\ No newline at end of file
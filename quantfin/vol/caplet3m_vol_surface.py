@@ -2,52 +2,43 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from quantfin.vol.caplet3m_vol_calibrator import Caplet3MVolCalibrator
+from quantfin.vol.slice_calibration import ExpirySurface, calibrate_slices
 
 
-class Caplet3MVolSurface:
+class Caplet3MVolSurface(ExpirySurface):
     """Represents a volatility surface for 3m caplets: vol = f(strike, expiry)"""
 
     def __init__(self, caplets = None, ibor_curve = None):
         self.caplets = caplets if caplets is not None else []
         self.ibor_curve = ibor_curve
-        self.models = {}
+        self.init_slices(((caplet.expiry, caplet.strike), caplet.expiry) for caplet in self.caplets)
+        self.expiry_index = None
 
     def add_caplet(self, caplet):
         self.caplets.append(caplet)
+        self.index_quote((caplet.expiry, caplet.strike), caplet.expiry, len(self.caplets) - 1)
 
-    def calibrate(self, engine="scipy"):
-        expiry_to_indices = {}
+    def update_caplet(self, caplet):
+        """Replace the caplet quote with the same expiry and strike if there is one, else add it"""
+        i = self.find_quote((caplet.expiry, caplet.strike), caplet.expiry)
+        if i is None:
+            self.add_caplet(caplet)
+            return
 
-        for i, caplet in enumerate(self.caplets):
-            if caplet.expiry not in expiry_to_indices:
-                expiry_to_indices[caplet.expiry] = [i]
-            else:
-                expiry_to_indices[caplet.expiry].append(i)
+        self.caplets[i] = caplet
 
-        for expiry, indices in expiry_to_indices.items():
-            caplets = [self.caplets[i] for i in indices]
-            calibrator = Caplet3MVolCalibrator(caplets, self.ibor_curve)
-            self.models[expiry] = calibrator.calibrate(engine=engine)
-
-    def get_vol(self, expiry, strike, forward):
-        """Return interpolated vol for a given expiry/strike"""
-        if not self.models:
-            raise Exception("Model is not yet calibrated, run calibrate() first")
+    def calibrate(self, engine="scipy", x0=None, previous=None, executor=None, max_workers=None, cache=None, refit_all=False):
+        """Fit one SABR model per expiry, see SliceSurface"""
+        previous_models = previous.models if previous is not None else self.models
+        expiries = [caplet.expiry for caplet in self.caplets]
+        settings = (engine,) + self.curve_settings(self.ibor_curve)
 
-        i, point = 0, 0
-        expiries = sorted(list(self.models.keys()))
-        for i, point in enumerate(expiries):
-            if expiry == point:
-                return self.models[point].get_vol(expiry, strike, forward)
-            elif expiry > point:
-                continue
-            else:
-                break
-
-        left_vol = self.models[expiries[i - 1]].get_vol(expiries[i - 1], strike, forward)
-        right_vol = self.models[expiries[i]].get_vol(expiries[i], strike, forward)
+        calibrators = {}
+        for expiry, indices in self.slices_to_fit(expiries, settings, refit_all).items():
+            caplets = [self.caplets[i] for i in indices]
+            calibrators[expiry] = Caplet3MVolCalibrator(caplets, self.ibor_curve)
 
-        return left_vol + ((right_vol - left_vol) / (expiries[i] - expiries[i - 1])) * (expiry - expiries[i - 1])
+        self.store_slices(calibrate_slices(calibrators, engine, x0, previous_models, executor, max_workers, cache))
 
     def plot_calibrated_vol_surface(self, expiry_start, expiry_end, strike_start, strike_end):
         if not self.models:
@@ -60,12 +51,8 @@ class Caplet3MVolSurface:
         strikes = np.linspace(strike_start, strike_end, strike_intervals)
 
         x, y = np.meshgrid(expiries, strikes, indexing="ij")
-        z = np.zeros((len(expiries), len(strikes)))
-
-        for i, t in enumerate(expiries):
-            for j, k in enumerate(strikes):
-                f = self.ibor_curve.forward_rate(t, t + 0.25)
-                z[i, j] = self.get_vol(t, k, f)
+        f = self.ibor_curve.forward_rate(x, x + 0.25)
+        z = self.get_vol(x, y, f)
 
         fig = plt.figure()
         ax = fig.add_subplot(111, projection='3d')
@@ -0,0 +1,123 @@
+from bisect import bisect_left
+
+import numpy as np
+
+from quantfin.vol.vol_model import VolModel
+
+
+def bracket(grid, x):
+    # left and right positions of x on a sorted grid and the weight on the right point, held flat off the ends
+    right = np.searchsorted(grid, x, side="left")
+    left = np.clip(right - 1, 0, len(grid) - 1)
+    right = np.clip(right, 0, len(grid) - 1)
+    span = grid[right] - grid[left]
+    weight = np.where(span > 0, (x - grid[left]) / np.where(span > 0, span, 1.0), 0.0)
+
+    return left, right, np.clip(weight, 0.0, 1.0)
+
+
+def bracket_scalar(grid, x):
+    # bracket() for a single query on a sorted list
+    right = bisect_left(grid, x)
+    left = min(max(right - 1, 0), len(grid) - 1)
+    right = min(right, len(grid) - 1)
+    span = grid[right] - grid[left]
+    weight = (x - grid[left]) / span if span > 0 else 0.0
+
+    return left, right, min(max(weight, 0.0), 1.0)
+
+
+class ExpiryIndex:
+    """
+    Sorted index over the per expiry SABR models of a surface. Queries are bracketed by bisection and vols are
+    linearly interpolated in expiry between the two neighbouring slices, held flat beyond the first and last
+    slice. A scalar query evaluates at most two slice models directly, array queries evaluate each slice they touch
+    once, vectorised over those queries.
+    """
+
+    def __init__(self, models):
+        keys = sorted(models.keys())
+        self.models = models
+        self.expiries = np.array(keys, dtype=float)
+        self.alpha = np.array([models[key].alpha for key in keys], dtype=float)
+        self.rho = np.array([models[key].rho for key in keys], dtype=float)
+        self.nu = np.array([models[key].nu for key in keys], dtype=float)
+        self.expiry_list = self.expiries.tolist()
+        self.model_list = [models[key] for key in keys]
+
+    @classmethod
+    def from_arrays(cls, expiries, alpha, rho, nu):
+        """Index straight over sorted expiries and per slice SABR parameter arrays, e.g. views into a snapshot"""
+        index = cls({})
+        index.expiries, index.alpha, index.rho, index.nu = expiries, alpha, rho, nu
+        index.models = index.expiry_list = index.model_list = None
+        return index
+
+    def slice_models(self):
+        # slice models in expiry order, built from the parameter arrays on first use for an index made from arrays
+        if self.model_list is None:
+            self.expiry_list = self.expiries.tolist()
+            self.model_list = [VolModel(*params) for params in zip(self.alpha.tolist(), self.rho.tolist(), self.nu.tolist())]
+        return self.model_list
+
+    def get_models(self):
+        if self.models is None:
+            self.models = dict(zip(self.expiries.tolist(), self.slice_models()))
+        return self.models
+
+    def get_vol_scalar(self, expiry, strike, forward):
+        models = self.slice_models()
+        expiries = self.expiry_list
+        right = bisect_left(expiries, expiry)
+        if right == len(expiries) or expiry == expiries[right]:
+            right = min(right, len(expiries) - 1)
+            return models[right].get_vol(expiries[right], strike, forward)
+        if right == 0:
+            return models[0].get_vol(expiries[0], strike, forward)
+
+        left = right - 1
+        weight = (expiry - expiries[left]) / (expiries[right] - expiries[left])
+        left_vol = models[left].get_vol(expiries[left], strike, forward)
+        right_vol = models[right].get_vol(expiries[right], strike, forward)
+
+        return (1 - weight) * left_vol + weight * right_vol
+
+    def get_vol(self, expiry, strike, forward, gradient=False):
+        if not gradient and isinstance(expiry, (float, int, np.number)) and isinstance(strike, (float, int, np.number)) and isinstance(forward, (float, int, np.number)):
+            return self.get_vol_scalar(expiry, strike, forward)
+
+        expiry, strike, forward = np.broadcast_arrays(
+            np.asarray(expiry, dtype=float), np.asarray(strike, dtype=float), np.asarray(forward, dtype=float)
+        )
+        left, right, weight = bracket(self.expiries, expiry)
+        vol = np.zeros(expiry.shape)
+        d_forward = np.zeros(expiry.shape)
+        sabr = {}
+
+        # only the slices some query actually puts weight on
+        for i in np.unique(np.concatenate([left[weight < 1].ravel(), right[weight > 0].ravel()])):
+            slice_expiry = self.expiries[i]
+            slice_weight = np.where(left == i, 1 - weight, 0.0) + np.where(right == i, weight, 0.0)
+            mask = slice_weight != 0
+            if not np.any(mask):
+                continue
+
+            model = self.slice_models()[i]
+            if not gradient:
+                vol[mask] += slice_weight[mask] * model.get_vol(slice_expiry, strike[mask], forward[mask])
+                continue
+
+            slice_vol, d_slice_vol = model.get_vol(slice_expiry, strike[mask], forward[mask], gradient=True)
+            vol[mask] += slice_weight[mask] * slice_vol
+            d_forward[mask] += slice_weight[mask] * d_slice_vol["forward"]
+            d_params = np.zeros(expiry.shape + (3,))
+            d_params[mask] = slice_weight[mask][:, None] * d_slice_vol["params"]
+            sabr[slice_expiry.item()] = d_params
+
+        if vol.ndim == 0:
+            vol, d_forward = float(vol), float(d_forward)
+
+        if not gradient:
+            return vol
+
+        return vol, {"forward": d_forward, "sabr": sabr}
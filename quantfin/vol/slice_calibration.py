@@ -0,0 +1,178 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from quantfin.snapshot.calibration_cache import fingerprint
+from quantfin.vol.expiry_index import ExpiryIndex
+from quantfin.vol.vol_calibrator import VolCalibrator
+from quantfin.vol.vol_model import VolModel
+
+
+def calibrate_slice(calibrator, engine, x0, previous):
+    # runs in a worker, failures are handed back rather than raised so the other slices carry on
+    try:
+        model = calibrator.calibrate(engine=engine, x0=x0, previous=previous)
+        return model, {"iterations": calibrator.iterations, "evaluations": calibrator.evaluations}, None
+    except Exception as e:
+        return None, None, f"{e.__class__.__name__}: {e}"
+
+
+def calibrate_slices(calibrators, engine="scipy", x0=None, previous_models=None, executor=None, max_workers=None, cache=None):
+    """
+    Calibrate a dict of independent slice calibrators, serially (executor=None) or over a "process" or "thread"
+    pool. Returns {key: (model, stats, error)} in the order of calibrators, whatever order the fits finish in.
+    With a CalibrationCache, slices whose quotes, forwards, engine and x0 were fitted before are not refitted.
+    """
+    previous_models = previous_models if previous_models is not None else {}
+    results = {}
+    fingerprints = {}
+    fit_calibrators = dict(calibrators)
+
+    if cache is not None:
+        for key, calibrator in calibrators.items():
+            vol_data = calibrator.extract_vol_data()
+            fingerprints[key] = fingerprint("sabr", engine, x0, *vol_data)
+            params = cache.get(fingerprints[key])
+            if params is not None:
+                results[key] = VolModel(*params), {"iterations": 0, "evaluations": 0, "cached": True}, None
+            else:
+                # the forwards behind the fingerprint are fitted as they are rather than computed again
+                fit_calibrators[key] = VolCalibrator(*vol_data)
+
+    keys = [key for key in calibrators if key not in results]
+    tasks = [(fit_calibrators[key], engine, x0, previous_models.get(key)) for key in keys]
+
+    if executor is None:
+        fitted = [calibrate_slice(*task) for task in tasks]
+    elif executor in ("process", "thread"):
+        pool = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        with pool(max_workers=max_workers) as pool_executor:
+            fitted = list(pool_executor.map(calibrate_slice, *zip(*tasks))) if tasks else []
+    else:
+        raise ValueError(f"Executor {executor} is not supported")
+
+    results.update(zip(keys, fitted))
+
+    if cache is not None:
+        for key, (model, _, error) in zip(keys, fitted):
+            if error is None:
+                cache.put(fingerprints[key], [float(model.alpha), float(model.rho), float(model.nu)])
+        cache.save()
+
+    return {key: results[key] for key in calibrators}
+
+
+class SliceSurface:
+    """
+    Bookkeeping shared by the vol surfaces, which fit one SABR model per slice of their quotes. Quotes are indexed
+    by key (expiry and strike, plus tenor for swaptions) so live updates find them without a scan, and slices with
+    quotes changed since they were last fitted are tracked as dirty. Quotes should only be changed through the
+    surface's add_* and update_* methods, which keep the index current.
+
+    calibrate() on a surface refits only the dirty slices and those without a model, or every slice when
+    refit_all is set or the engine (or the curves the forwards come from) changed. Each slice warm starts from its
+    model in previous (an earlier calibrated surface) if given, else from the surface's last calibration, else from
+    x0 / the calibrator default. Slices are fitted serially, or over a "process" or "thread" pool with executor;
+    slices that fail are listed in failed_slices instead of stopping the calibration. Slices found in cache (a
+    CalibrationCache) by the fingerprint of their quotes and forwards are not refitted.
+    """
+
+    @property
+    def models(self):
+        # a surface restored from a snapshot holds only its compiled lookup until the models themselves are needed
+        if self.slice_models is None:
+            self.slice_models = self.restore_models()
+        return self.slice_models
+
+    @models.setter
+    def models(self, models):
+        self.slice_models = models
+
+    def is_calibrated(self):
+        return self.slice_models is None or bool(self.slice_models)
+
+    def restore_models(self):
+        raise NotImplementedError
+
+    def init_slices(self, quotes):
+        # quotes are the (quote key, slice key) pairs of the quotes the surface starts with, in order
+        self.models = {}
+        self.calibration_stats = {}
+        self.failed_slices = {}
+        self.quote_positions = {}
+        self.dirty_slices = set()
+        self.calibrated_settings = None
+        for position, (quote_key, slice_key) in enumerate(quotes):
+            self.index_quote(quote_key, slice_key, position)
+
+    def index_quote(self, quote_key, slice_key, position):
+        self.quote_positions.setdefault(quote_key, position)
+        self.dirty_slices.add(slice_key)
+
+    def find_quote(self, quote_key, slice_key):
+        # position of the quote to replace, marking its slice dirty, or None when the quote is new
+        position = self.quote_positions.get(quote_key)
+        if position is not None:
+            self.dirty_slices.add(slice_key)
+        return position
+
+    @staticmethod
+    def curve_settings(*curves):
+        # curves by identity and version, so knots added in place also count as a change
+        return tuple((curve, getattr(getattr(curve, "curve_model", None), "version", 0)) for curve in curves)
+
+    def slices_to_fit(self, slice_keys, settings, refit_all=False):
+        """
+        Quote positions grouped by slice key, for the slices that need fitting: those with changed quotes or no
+        model yet, or every slice when refit_all is set or settings differ from the last calibration's.
+        """
+        refit_all = refit_all or settings != self.calibrated_settings
+        self.calibrated_settings = settings
+
+        slices = {}
+        for position, key in enumerate(slice_keys):
+            slices.setdefault(key, []).append(position)
+
+        return {key: positions for key, positions in slices.items() if refit_all or key in self.dirty_slices or key not in self.models}
+
+    def store_slices(self, results):
+        # failed slices are dropped and left dirty with their error in failed_slices, the rest keep their fresh fits
+        for key, (model, stats, error) in results.items():
+            if error is not None:
+                self.failed_slices[key] = error
+                self.models.pop(key, None)
+                self.calibration_stats.pop(key, None)
+            else:
+                self.models[key] = model
+                self.calibration_stats[key] = stats
+                self.failed_slices.pop(key, None)
+                self.dirty_slices.discard(key)
+
+        self.compile_slices()
+
+    def compile_slices(self):
+        raise NotImplementedError
+
+
+class ExpirySurface(SliceSurface):
+    """Slice surface with one SABR model per expiry, looked up through an ExpiryIndex"""
+
+    def compile_slices(self):
+        self.expiry_index = ExpiryIndex(self.models)
+
+    def restore_models(self):
+        return self.expiry_index.get_models()
+
+    def get_expiry_index(self):
+        # rebuilt whenever the models are replaced, e.g. by calibrate() or by assigning models
+        if self.expiry_index is None or self.expiry_index.models is not self.slice_models:
+            self.expiry_index = ExpiryIndex(self.models)
+        return self.expiry_index
+
+    def get_vol(self, expiry, strike, forward, gradient=False):
+        """
+        Return interpolated vol for given expiries/strikes/forwards, scalars or arrays. With gradient=True also
+        returns {"forward": d vol / d forward, "sabr": {expiry: d vol / d (alpha, rho, nu) of that slice's model}}
+        """
+        if not self.is_calibrated():
+            raise Exception("Model is not yet calibrated, run calibrate() first")
+
+        return self.get_expiry_index().get_vol(expiry, strike, forward, gradient)
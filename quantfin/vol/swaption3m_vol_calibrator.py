@@ -1,13 +1,18 @@
+from quantfin.instruments.forward_swap_rates import ForwardSwapRateCache
 from quantfin.vol.vol_calibrator import VolCalibrator
 
 
 class Swaption3MVolCalibrator:
     """VolCalibrator class for 3m Caplets"""
 
-    def __init__(self, swaptions, ibor_curve, ois_curve):
+    def __init__(self, swaptions, ibor_curve, ois_curve, swap_rate_cache=None):
         self.swaptions = swaptions
         self.ibor_curve = ibor_curve
         self.ois_curve = ois_curve
+        # forward swap rates shared with the rest of the surface, every strike of a slice reads the same one
+        self.swap_rate_cache = swap_rate_cache if swap_rate_cache is not None else ForwardSwapRateCache(ois_curve, ibor_curve)
+        self.iterations = 0
+        self.evaluations = 0
 
     def extract_vol_data(self):
         # Extract data from swaptions into a form we can pass into the base VolCalibrator
@@ -15,18 +20,22 @@ class Swaption3MVolCalibrator:
         strikes = []
         market_vols = []
         forwards = []
+        self.swap_rate_cache.prepare([(swaption.expiry, swaption.tenor) for swaption in self.swaptions])
 
         for swaption in self.swaptions:
             expiries.append(swaption.expiry)
             strikes.append(swaption.strike)
             market_vols.append(swaption.market_vol)
-            forwards.append(swaption.forward_swap_rate(self.ois_curve, self.ibor_curve))
+            forwards.append(swaption.forward_swap_rate(self.ois_curve, self.ibor_curve, self.swap_rate_cache))
 
         return expiries, strikes, market_vols, forwards
 
-    def calibrate(self, engine="scipy"):
+    def calibrate(self, engine="scipy", x0=None, previous=None):
         expiries, strikes, market_vols, forwards = self.extract_vol_data()
 
         base_calibrator = VolCalibrator(expiries, strikes, market_vols, forwards)
+        model = base_calibrator.calibrate(engine=engine, x0=x0, previous=previous)
+        self.iterations = base_calibrator.iterations
+        self.evaluations = base_calibrator.evaluations
 
-        return base_calibrator.calibrate(engine=engine)
\ No newline at end of file
+        return model
\ No newline at end of file
@@ -0,0 +1,169 @@
+import numpy as np
+
+from quantfin.vol.expiry_index import bracket, bracket_scalar
+from quantfin.vol.vol_model import VolModel
+
+
+class Swaption3MVolCube:
+    """
+    Compiled form of the per (expiry, tenor) SABR models of a swaption surface: dense alpha, rho and nu arrays over
+    the expiry x tenor grid (NaN where no slice was calibrated), bracketed by bisection on each axis and held flat
+    beyond the grid.
+
+    interpolation="vol" blends the vols of the four corner models bilinearly, each evaluated at its own expiry.
+    interpolation="params" blends the corner parameters instead and evaluates SABR once at the query expiry.
+    """
+
+    def __init__(self, models, interpolation="vol"):
+        if interpolation not in ("vol", "params"):
+            raise ValueError(f"Interpolation {interpolation} is not supported")
+
+        self.interpolation = interpolation
+        self.compile(
+            [expiry for expiry, _ in models], [tenor for _, tenor in models],
+            [model.alpha for model in models.values()], [model.rho for model in models.values()], [model.nu for model in models.values()]
+        )
+        self.models = models
+
+    @classmethod
+    def from_arrays(cls, expiries, tenors, alpha, rho, nu, interpolation="vol"):
+        """Cube over per slice expiry, tenor and SABR parameter arrays, e.g. views into a snapshot"""
+        cube = cls({}, interpolation)
+        cube.compile(expiries, tenors, alpha, rho, nu)
+        cube.models = None
+        return cube
+
+    def compile(self, expiries, tenors, alpha, rho, nu):
+        # scatter the slices onto the dense expiry x tenor grid
+        self.expiries, i = np.unique(np.asarray(expiries, dtype=float), return_inverse=True)
+        self.tenors, j = np.unique(np.asarray(tenors, dtype=float), return_inverse=True)
+        self.expiry_list = self.expiries.tolist()
+        self.tenor_list = self.tenors.tolist()
+
+        shape = (len(self.expiries), len(self.tenors))
+        self.alpha, self.rho, self.nu = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        self.alpha[i, j], self.rho[i, j], self.nu[i, j] = alpha, rho, nu
+
+    def get_models(self):
+        # slice models by (expiry, tenor), built from the dense arrays on first use for a cube made from arrays
+        if self.models is None:
+            i, j = np.nonzero(~np.isnan(self.alpha))
+            self.models = {
+                (self.expiry_list[a], self.tenor_list[b]): VolModel(self.alpha.item(a, b), self.rho.item(a, b), self.nu.item(a, b))
+                for a, b in zip(i.tolist(), j.tolist())
+            }
+        return self.models
+
+    def corners(self, expiry, tenor):
+        # the four (expiry position, tenor position, bilinear weight) corners around every query
+        expiry_left, expiry_right, w_T = bracket(self.expiries, expiry)
+        tenor_left, tenor_right, w_tau = bracket(self.tenors, tenor)
+
+        return [
+            (expiry_left, tenor_left, (1 - w_T) * (1 - w_tau)),
+            (expiry_left, tenor_right, (1 - w_T) * w_tau),
+            (expiry_right, tenor_left, w_T * (1 - w_tau)),
+            (expiry_right, tenor_right, w_T * w_tau)
+        ]
+
+    def corner_params(self, i, j):
+        params = self.alpha[i, j], self.rho[i, j], self.nu[i, j]
+        missing = np.isnan(params[0])
+        if np.any(missing):
+            raise KeyError((self.expiries[i[missing][0]].item(), self.tenors[j[missing][0]].item()))
+
+        return params
+
+    def add_sabr_gradient(self, sabr, i, j, mask, d_params):
+        # spread per query parameter gradients onto the (expiry, tenor) slices they came from
+        for key_i, key_j in dict.fromkeys(zip(i[mask].tolist(), j[mask].tolist())):
+            key = (self.expiries[key_i].item(), self.tenors[key_j].item())
+            rows = mask & (i == key_i) & (j == key_j)
+            if key not in sabr:
+                sabr[key] = np.zeros(mask.shape + (3,))
+            sabr[key][rows] += d_params[rows[mask]]
+
+    def get_vol_scalar(self, expiry, tenor, strike, forward):
+        # a single query reads its corners straight off the dense parameter arrays
+        expiry_left, expiry_right, w_T = bracket_scalar(self.expiry_list, expiry)
+        tenor_left, tenor_right, w_tau = bracket_scalar(self.tenor_list, tenor)
+        corners = [
+            (expiry_left, tenor_left, (1 - w_T) * (1 - w_tau)),
+            (expiry_left, tenor_right, (1 - w_T) * w_tau),
+            (expiry_right, tenor_left, w_T * (1 - w_tau)),
+            (expiry_right, tenor_right, w_T * w_tau)
+        ]
+
+        vol = 0.0
+        params = [0.0, 0.0, 0.0]
+        for i, j, weight in corners:
+            if weight == 0:
+                continue
+
+            alpha, rho, nu = self.alpha.item(i, j), self.rho.item(i, j), self.nu.item(i, j)
+            if alpha != alpha:
+                raise KeyError((self.expiry_list[i], self.tenor_list[j]))
+
+            if self.interpolation == "vol":
+                vol += weight * VolModel(alpha, rho, nu).get_vol(self.expiry_list[i], strike, forward)
+            else:
+                params = [blended + weight * corner for blended, corner in zip(params, (alpha, rho, nu))]
+
+        if self.interpolation == "vol":
+            return vol
+
+        expiry = min(max(expiry, self.expiry_list[0]), self.expiry_list[-1])
+        return VolModel(*params).get_vol(expiry, strike, forward)
+
+    def get_vol(self, expiry, tenor, strike, forward, gradient=False):
+        scalar = (float, int, np.number)
+        if not gradient and isinstance(expiry, scalar) and isinstance(tenor, scalar) and isinstance(strike, scalar) and isinstance(forward, scalar):
+            return self.get_vol_scalar(expiry, tenor, strike, forward)
+
+        expiry, tenor, strike, forward = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (expiry, tenor, strike, forward)))
+        vol = np.zeros(expiry.shape)
+        d_forward = np.zeros(expiry.shape)
+        sabr = {}
+
+        if self.interpolation == "vol":
+            for i, j, weight in self.corners(expiry, tenor):
+                mask = weight != 0
+                if not np.any(mask):
+                    continue
+
+                model = VolModel(*self.corner_params(i[mask], j[mask]))
+                if not gradient:
+                    vol[mask] += weight[mask] * model.get_vol(self.expiries[i[mask]], strike[mask], forward[mask])
+                    continue
+
+                corner_vol, d_corner_vol = model.get_vol(self.expiries[i[mask]], strike[mask], forward[mask], gradient=True)
+                vol[mask] += weight[mask] * corner_vol
+                d_forward[mask] += weight[mask] * d_corner_vol["forward"]
+                self.add_sabr_gradient(sabr, i, j, mask, weight[mask][:, None] * d_corner_vol["params"])
+        else:
+            corners = self.corners(expiry, tenor)
+            params = [np.zeros(expiry.shape), np.zeros(expiry.shape), np.zeros(expiry.shape)]
+            for i, j, weight in corners:
+                mask = weight != 0
+                if np.any(mask):
+                    for blended, corner in zip(params, self.corner_params(i[mask], j[mask])):
+                        blended[mask] += weight[mask] * corner
+
+            model = VolModel(*params)
+            # evaluated at the query expiry, clipped to the grid like the blending weights
+            expiry = np.clip(expiry, self.expiries[0], self.expiries[-1])
+            if not gradient:
+                vol = model.get_vol(expiry, strike, forward)
+            else:
+                vol, d_vol = model.get_vol(expiry, strike, forward, gradient=True)
+                d_forward = d_vol["forward"]
+                for i, j, weight in corners:
+                    mask = weight != 0
+                    self.add_sabr_gradient(sabr, i, j, mask, weight[mask][:, None] * d_vol["params"][mask])
+
+        vol = float(vol) if np.ndim(vol) == 0 else vol
+        if not gradient:
+            return vol
+
+        d_forward = float(d_forward) if np.ndim(d_forward) == 0 else d_forward
+        return vol, {"forward": d_forward, "sabr": sabr}
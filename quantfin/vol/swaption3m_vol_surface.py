@@ -1,75 +1,86 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from quantfin.instruments.forward_swap_rates import ForwardSwapRateCache
 from quantfin.vol.caplet3m_vol_calibrator import Caplet3MVolCalibrator
+from quantfin.vol.slice_calibration import SliceSurface, calibrate_slices
 from quantfin.vol.swaption3m_vol_calibrator import Swaption3MVolCalibrator
+from quantfin.vol.swaption3m_vol_cube import Swaption3MVolCube
 
 
-class Swaption3MVolSurface:
+class Swaption3MVolSurface(SliceSurface):
     """Represents a volatility surface for 3m swaptions: vol = f(strike, expiry)"""
 
-    def __init__(self, swaptions=None, ibor_curve=None, ois_curve=None):
+    def __init__(self, swaptions=None, ibor_curve=None, ois_curve=None, interpolation="vol"):
         self.swaptions = swaptions if swaptions is not None else []
         self.ibor_curve = ibor_curve
         self.ois_curve = ois_curve
-        self.models = {}
+        self.init_slices(
+            ((swaption.expiry, swaption.tenor, swaption.strike), (swaption.expiry, swaption.tenor)) for swaption in self.swaptions
+        )
+        # "vol" blends the corner vols, "params" blends the corner SABR params, see Swaption3MVolCube
+        self.interpolation = interpolation
+        self.vol_cube = None
+        self.swap_rate_cache = None
 
     def add_swaption(self, swaption):
         self.swaptions.append(swaption)
-
-    def calibrate(self, engine="scipy"):
-        expiry_tenor_to_indices = {}
-
-        for i, swaption in enumerate(self.swaptions):
-            if (swaption.expiry, swaption.tenor) not in expiry_tenor_to_indices:
-                expiry_tenor_to_indices[(swaption.expiry, swaption.tenor)] = [i]
-            else:
-                expiry_tenor_to_indices[(swaption.expiry, swaption.tenor)].append(i)
-
-        for expiry_tenor, indices in expiry_tenor_to_indices.items():
-            expiry, tenor = expiry_tenor
+        self.index_quote((swaption.expiry, swaption.tenor, swaption.strike), (swaption.expiry, swaption.tenor), len(self.swaptions) - 1)
+
+    def update_swaption(self, swaption):
+        """Replace the swaption quote with the same expiry, tenor and strike if there is one, else add it"""
+        i = self.find_quote((swaption.expiry, swaption.tenor, swaption.strike), (swaption.expiry, swaption.tenor))
+        if i is None:
+            self.add_swaption(swaption)
+            return
+
+        self.swaptions[i] = swaption
+
+    def calibrate(self, engine="scipy", x0=None, previous=None, executor=None, max_workers=None, cache=None, refit_all=False):
+        """Fit one SABR model per (expiry, tenor), see SliceSurface"""
+        previous_models = previous.models if previous is not None else self.models
+        expiry_tenors = [(swaption.expiry, swaption.tenor) for swaption in self.swaptions]
+        settings = (engine,) + self.curve_settings(self.ibor_curve, self.ois_curve)
+
+        swap_rate_cache = self.get_swap_rate_cache()
+        calibrators = {}
+        for expiry_tenor, indices in self.slices_to_fit(expiry_tenors, settings, refit_all).items():
             swaptions = [self.swaptions[i] for i in indices]
-            calibrator = Swaption3MVolCalibrator(swaptions, self.ibor_curve, self.ois_curve)
-            self.models[(expiry, tenor)] = calibrator.calibrate(engine=engine)
-
-    def get_vol(self, expiry, tenor, strike, forward):
-        """Return interpolated vol for a given expiry/strike/tenor"""
-        if not self.models:
+            calibrators[expiry_tenor] = Swaption3MVolCalibrator(swaptions, self.ibor_curve, self.ois_curve, swap_rate_cache)
+
+        # forwards for every slice being fitted in one pass over the cube's schedules
+        swap_rate_cache.prepare(list(calibrators))
+
+        self.store_slices(calibrate_slices(calibrators, engine, x0, previous_models, executor, max_workers, cache))
+
+    def get_swap_rate_cache(self):
+        # kept while the surface's curves stay the same, pass it to Swaption3M.price to reuse the forwards
+        if self.swap_rate_cache is None or self.swap_rate_cache.ois_curve is not self.ois_curve or self.swap_rate_cache.ibor_curve is not self.ibor_curve:
+            self.swap_rate_cache = ForwardSwapRateCache(self.ois_curve, self.ibor_curve)
+        return self.swap_rate_cache
+
+    def compile_slices(self):
+        self.vol_cube = Swaption3MVolCube(self.models, self.interpolation)
+
+    def restore_models(self):
+        return self.vol_cube.get_models()
+
+    def get_vol_cube(self):
+        # rebuilt whenever the models are replaced, e.g. by calibrate() or by assigning models
+        if self.vol_cube is None or self.vol_cube.models is not self.slice_models or self.vol_cube.interpolation != self.interpolation:
+            self.vol_cube = Swaption3MVolCube(self.models, self.interpolation)
+        return self.vol_cube
+
+    def get_vol(self, expiry, tenor, strike, forward, gradient=False):
+        """
+        Return interpolated vol for given expiries/tenors/strikes/forwards, scalars or arrays. With gradient=True
+        also returns {"forward": d vol / d forward, "sabr": {(expiry, tenor): d vol / d (alpha, rho, nu) of that
+        slice's model}}
+        """
+        if not self.is_calibrated():
             raise Exception("Model is not yet calibrated, run calibrate() first")
 
-        def find_bracket(x, grid):
-            for i, point in enumerate(grid):
-                if x == point:
-                    return point, point
-                elif x < point:
-                    return grid[i - 1], point
-
-            return grid[-1], grid[-1]
-
-        def weight(x, x1, x2):
-            if x1 == x2:
-                return 1.0
-            return (x - x1) / (x2 - x1)
-
-        expiries = sorted(set(e for e, _ in self.models.keys()))
-        tenors = sorted(set(t for _, t in self.models.keys()))
-        T1, T2 = find_bracket(expiry, expiries)
-        tau1, tau2 = find_bracket(tenor, tenors)
-
-        w_T = weight(expiry, T1, T2)
-        w_tau = weight(tenor, tau1, tau2)
-
-        v11 = self.models[(T1, tau1)].get_vol(T1, strike, forward)
-        v12 = self.models[(T1, tau2)].get_vol(T1, strike, forward)
-        v21 = self.models[(T2, tau1)].get_vol(T2, strike, forward)
-        v22 = self.models[(T2, tau2)].get_vol(T2, strike, forward)
-
-        return (
-            (1 - w_T) * (1 - w_tau) * v11 +
-            (1 - w_T) * (w_tau) * v12 +
-            (w_T) * (1 - w_tau) * v21 +
-            (w_T) * (w_tau) * v22
-        )
+        return self.get_vol_cube().get_vol(expiry, tenor, strike, forward, gradient)
 
     def plot_calibrated_vol_surface(self, expiry_start, expiry_end, strike_start, strike_end):
         raise NotImplementedError("Not implemented")
@@ -1,6 +1,7 @@
 import numpy as np
 from scipy.optimize import least_squares
 
+from quantfin.optimiser.base_optimiser import warm_start
 from quantfin.optimiser.gauss_newton_optimiser import GaussNewtonOptimiser
 from quantfin.optimiser.levenberg_marquardt_optimiser import LevenbergMarquardtOptimiser
 from quantfin.optimiser.sqp_optimiser import SQPOptimiser
@@ -15,33 +16,54 @@ class VolCalibrator:
         self.strikes = strikes
         self.market_vols = market_vols
         self.forwards = forwards
+        self.iterations = 0
+        self.evaluations = 0
+
+    def extract_vol_data(self):
+        return self.expiries, self.strikes, self.market_vols, self.forwards
+
+    def initial_guess(self, x0=None, previous=None):
+        # warm start from a previously calibrated VolModel
+        previous_params = [previous.alpha, previous.rho, previous.nu] if previous is not None else None
+        return warm_start(x0, previous_params, [0.2, 0.2, 0.5])
 
     def residuals(self, params, *args):
+        self.evaluations += 1
+        alpha, rho, nu = params
+        expiries, strikes, forwards, market_vols = args
+        model = VolModel(alpha, rho, nu)
+
+        return model.get_vol(np.asarray(expiries), np.asarray(strikes), np.asarray(forwards)) - np.asarray(market_vols)
+
+    def jacobian(self, params, *args):
+        # Closed form derivatives of the residuals with respect to alpha, rho and nu, ATM quotes included
         alpha, rho, nu = params
         expiries, strikes, forwards, market_vols = args
         model = VolModel(alpha, rho, nu)
+        _, gradient = model.get_vol(np.asarray(expiries), np.asarray(strikes), np.asarray(forwards), gradient=True)
+
+        return gradient["params"]
 
-        return np.array([
-            model.get_vol(T, K, F) - market_vol
-            for T, K, F, market_vol in zip(expiries, strikes, forwards, market_vols)
-        ])
+    def calibrate(self, engine="scipy", x0=None, previous=None):
+        self.iterations = 0
+        self.evaluations = 0
 
-    def calibrate(self, engine="scipy"):
         if engine == "scipy":
             expiries = np.array(self.expiries)
             strikes = np.array(self.strikes)
             forwards = np.array(self.forwards)
             market_vols = np.array(self.market_vols)
 
-            # initial guesses
-            x0 = np.array([0.2, 0.2, 0.5])
-
             lower = [1e-8, -0.999, 1e-8]
             upper = [10.0, 0.999, 5.0]
 
+            # initial guesses, kept inside the bounds
+            x0 = np.clip(self.initial_guess(x0, previous), lower, upper)
+
             result = least_squares(
                 fun=self.residuals,
                 x0=x0,
+                jac=self.jacobian,
                 bounds=(lower, upper),
                 args=(expiries, strikes, forwards, market_vols),
                 method='trf',
@@ -49,6 +71,8 @@ class VolCalibrator:
             )
 
             residuals = result.fun
+            # trf evaluates one jacobian per iteration
+            self.iterations = result.njev
 
             # RMS error
             rms_error = np.sqrt(np.mean(residuals ** 2))
@@ -63,37 +87,43 @@ class VolCalibrator:
             print("Fitted params:", alpha_fit, rho_fit, nu_fit)
         elif engine == "gauss_newton":
             optimiser = GaussNewtonOptimiser()
-            x0 = np.array([0.2, 0.2, 0.5])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
                 (self.expiries, self.strikes, self.forwards, self.market_vols),
-                VolModel().safe_params
+                VolModel().safe_params,
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             alpha_fit, rho_fit, nu_fit = params
             print("Fitted params:", alpha_fit, rho_fit, nu_fit)
         elif engine == "levenberg_marquardt":
             optimiser = LevenbergMarquardtOptimiser()
-            x0 = np.array([0.2, 0.2, 0.5])
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
                 (self.expiries, self.strikes, self.forwards, self.market_vols),
-                VolModel().safe_params
+                VolModel().safe_params,
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             alpha_fit, rho_fit, nu_fit = params
         elif engine == "sqp":
             optimiser = SQPOptimiser()
-            # x0 = np.array([0.00000001, 0.8, 0.0000001]) # Below is actual decent guess but this one is for testing constrained optimisation
-            x0 = np.array([0.2, 0.2, 0.5])
+            # x0 = np.array([0.00000001, 0.8, 0.0000001]) # Default guess is decent, this one is for testing constrained optimisation
+            x0 = self.initial_guess(x0, previous)
             params = optimiser.optimise(
                 x0,
                 self.residuals,
                 (self.expiries, self.strikes, self.forwards, self.market_vols),
                 VolModel().safe_params,
                 VolModel().constraints,
-                VolModel().gradient_constraints
+                VolModel().gradient_constraints,
+                jac=self.jacobian
             )
+            self.iterations = optimiser.iterations
             alpha_fit, rho_fit, nu_fit = params
             print("Fitted params:", alpha_fit, rho_fit, nu_fit)
         else:
@@ -1,4 +1,5 @@
 import math
+
 import numpy as np
 
 class VolModel:
@@ -38,7 +39,61 @@ class VolModel:
             [0.0, 0.0, -1.0],
         ])
 
-    def get_vol(self, expiry, strike, forward):
+    def get_vol(self, expiry, strike, forward, gradient=False):
+        """
+        SABR vol for the given expiries, strikes and forwards, scalars or arrays broadcast against each other.
+        Quotes with the strike at the forward use the ATM limit elementwise. With gradient=True also returns the
+        derivatives {"params": d vol / d (alpha, rho, nu) along a last axis, "forward": d vol / d forward}, taken
+        at beta = 1.
+        """
+        if not gradient and isinstance(expiry, (float, int, np.number)) and isinstance(strike, (float, int, np.number)) and isinstance(forward, (float, int, np.number)):
+            return self.get_vol_scalar(expiry, strike, forward)
+
+        t = np.asarray(expiry, dtype=float)
+        k = np.asarray(strike, dtype=float)
+        f = np.asarray(forward, dtype=float)
+        alpha = self.alpha
+        beta = self.beta
+        rho = self.rho
+        nu = self.nu
+
+        atm = np.abs(f - k) < 1e-12
+        # ATM quotes take log(F/K) = 0 and z / x = 1, dummy values keep the masked out branch finite
+        logFK = np.where(atm, 0.0, np.log(f / np.where(atm, f, k)))
+        fk_beta = np.where(atm, f ** (1 - beta), (f * k) ** ((1 - beta) / 2))
+
+        z = (nu / alpha) * fk_beta * logFK
+        z_safe = np.where(atm, 1.0, z)
+        root = np.sqrt(1 - 2 * rho * z_safe + z_safe ** 2)
+        x = np.log((root + z_safe - rho) / (1 - rho))
+
+        term_1 = alpha / (fk_beta * (1 + (((1 - beta) ** 2) / 24) * (logFK ** 2) + (((1 - beta) ** 4) / 1920) * (logFK ** 4)))
+        term_2 = np.where(atm, 1.0, z_safe / x)
+        term_3 = (1 + (((1 - beta) ** 2) / 24) * ((alpha ** 2) / (fk_beta ** 2)) + (1 / 4) * (rho * beta * alpha * nu) / fk_beta + ((2 - 3 * rho ** 2) / 24) * nu ** 2) * t
+
+        vol = term_1 * term_2 * term_3
+        vol = float(vol) if vol.ndim == 0 else vol
+
+        if not gradient:
+            return vol
+
+        # z / x as a function of z and rho, with dx/dz = 1 / sqrt(1 - 2 rho z + z^2) and z / x ~ 1 - rho z / 2 at ATM
+        d_x_d_rho = -(z_safe + root) / (root * (root + z_safe - rho)) + 1 / (1 - rho)
+        d_ratio_d_z = np.where(atm, -rho / 2, (x - z_safe / root) / x ** 2)
+        d_ratio_d_rho = np.where(atm, 0.0, -z_safe / x ** 2 * d_x_d_rho)
+
+        d_term_3 = self.d_correction(t)
+        d_params = np.stack(np.broadcast_arrays(
+            term_2 * term_3 - term_3 * z * d_ratio_d_z + alpha * term_2 * d_term_3[0],
+            alpha * term_3 * d_ratio_d_rho + alpha * term_2 * d_term_3[1],
+            term_3 * d_ratio_d_z * logFK + alpha * term_2 * d_term_3[2]
+        ), axis=-1)
+        d_forward = term_3 * d_ratio_d_z * nu / f
+        d_forward = float(d_forward) if d_forward.ndim == 0 else d_forward
+
+        return vol, {"params": d_params, "forward": d_forward}
+
+    def get_vol_scalar(self, expiry, strike, forward):
         f = forward
         k = strike
         alpha = self.alpha
@@ -65,3 +120,12 @@ class VolModel:
         term_3 = (1 + (((1 - beta) ** 2) / 24) * ((alpha ** 2) / (fk_beta ** 2)) + (1 / 4) * (rho * beta * alpha * nu) / fk_beta + ((2 - 3 * rho ** 2) / 24) * nu ** 2) * expiry
 
         return term_1 * term_2 * term_3
+
+    def d_correction(self, expiry):
+        # derivatives of (1 + rho alpha nu / 4 + (2 - 3 rho^2) nu^2 / 24) * expiry w.r.t. alpha, rho, nu at beta = 1
+        alpha, rho, nu = self.alpha, self.rho, self.nu
+        return [
+            rho * nu / 4 * expiry,
+            (alpha * nu / 4 - rho * nu ** 2 / 4) * expiry,
+            (rho * alpha / 4 + (2 - 3 * rho ** 2) * nu / 12) * expiry
+        ]
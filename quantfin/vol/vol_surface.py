@@ -1,8 +1,9 @@
 import numpy as np
 
+from quantfin.vol.slice_calibration import ExpirySurface, calibrate_slices
 from quantfin.vol.vol_calibrator import VolCalibrator
 
-class VolSurface:
+class VolSurface(ExpirySurface):
     """Represents a volatility surface: vol = f(strike, expiry)"""
 
     def __init__(self, expiries=None, strikes=None, vols=None, forwards=None):
@@ -10,47 +11,36 @@ class VolSurface:
         self.strikes = strikes if strikes is not None else []
         self.vols = vols if vols is not None else []
         self.forwards = forwards if forwards is not None else []
-        self.models = {}
+        self.init_slices(((T, K), T) for T, K in zip(self.expiries, self.strikes))
+        self.expiry_index = None
 
     def add_market_vol(self, expiry, strike, vol, forward):
         self.expiries.append(expiry)
         self.strikes.append(strike)
         self.vols.append(vol)
         self.forwards.append(forward)
+        self.index_quote((expiry, strike), expiry, len(self.expiries) - 1)
 
-    def calibrate(self, engine="scipy"):
-        expiry_to_indices = {}
+    def update_market_vol(self, expiry, strike, vol, forward):
+        """Replace the quote at (expiry, strike) if there is one, else add it"""
+        i = self.find_quote((expiry, strike), expiry)
+        if i is None:
+            self.add_market_vol(expiry, strike, vol, forward)
+            return
 
-        for i, T in enumerate(self.expiries):
-            if T not in expiry_to_indices:
-                expiry_to_indices[T] = [i]
-            else:
-                expiry_to_indices[T].append(i)
+        self.vols[i] = vol
+        self.forwards[i] = forward
 
-        for expiry, indices in expiry_to_indices.items():
+    def calibrate(self, engine="scipy", x0=None, previous=None, executor=None, max_workers=None, cache=None, refit_all=False):
+        """Fit one SABR model per expiry, see SliceSurface"""
+        previous_models = previous.models if previous is not None else self.models
+
+        calibrators = {}
+        for expiry, indices in self.slices_to_fit(self.expiries, (engine,), refit_all).items():
             expiries = [self.expiries[i] for i in indices]
             strikes = [self.strikes[i] for i in indices]
             vols = [self.vols[i] for i in indices]
             forwards = [self.forwards[i] for i in indices]
-            calibrator = VolCalibrator(expiries, strikes, vols, forwards)
-            self.models[expiry] = calibrator.calibrate(engine=engine)
-
-    def get_vol(self, expiry, strike, forward):
-        """Return interpolated vol for a given expiry/strike"""
-        if not self.models:
-            raise Exception("Model is not yet calibrated, run calibrate() first")
-
-        i, point = 0, 0
-        expiries = sorted(list(self.models.keys()))
-        for i, point in enumerate(expiries):
-            if expiry == point:
-                return self.models[point].get_vol(expiry, strike, forward)
-            elif expiry > point:
-                continue
-            else:
-                break
-
-        left_vol = self.models[expiries[i - 1]].get_vol(expiries[i - 1], strike, forward)
-        right_vol = self.models[expiries[i]].get_vol(expiries[i], strike, forward)
-
-        return left_vol + ((right_vol - left_vol) / (expiries[i] - expiries[i - 1])) * (expiry - expiries[i - 1])
+            calibrators[expiry] = VolCalibrator(expiries, strikes, vols, forwards)
+
+        self.store_slices(calibrate_slices(calibrators, engine, x0, previous_models, executor, max_workers, cache))
@@ -1,7 +1,12 @@
+import numpy as np
 import pytest
 
+from examples.data.markets import OIS_FUTURES, OIS_SWAPS, SWAPS_3M
 from quantfin.bootstrap.bootstrapper import MultiCurveBootstrapper
+from quantfin.bootstrap.global_curve_solver import GlobalCurveSolver
 from quantfin.curves.curve_manager import CurveManager
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.instruments.cashflow_matrix import CashflowMatrix
 from quantfin.instruments.ois_future import OISFuture
 from quantfin.instruments.ois_swap import OISSwap
 from quantfin.instruments.swap_3m import Swap3M
@@ -63,3 +68,148 @@ def test_bootstrapper_swap_prices():
     for swap in swaps3m:
         pv_model = swap.price(ois_curve, ibor3m_curve)
         assert abs(pv_model) < 1e-3
+
+def reference_bootstrap(ois_instruments, swaps3m):
+    # direct transcription of the sequential bootstrap, resumming every leg for each knot
+    ois_model = LogLinearBootstrappedCurveModel()
+    for instrument in ois_instruments:
+        if isinstance(instrument, OISFuture):
+            df = ois_model.df(instrument.maturity - instrument.accrual) / (1 + instrument.accrual * instrument.market_rate())
+        else:
+            schedule = np.arange(instrument.freq, instrument.maturity + 1e-12, instrument.freq)
+            k = sum(instrument.freq * instrument.fixed_rate * ois_model.df(t) for t in schedule[:-1])
+            df = (1 - k) / (instrument.freq * instrument.fixed_rate + 1)
+        ois_model.add_knot(instrument.maturity, df)
+
+    ibor_model = LogLinearBootstrappedCurveModel()
+    for swap in swaps3m:
+        schedule = np.arange(0.25, swap.maturity + 1e-12, 0.25)
+        fixed_leg_pv = swap.fixed_rate * sum(0.25 * ois_model.df(time) for time in schedule)
+        k = sum(ois_model.df(time) * ibor_model.forward_rate(time - 0.25, time) * 0.25 for time in schedule[:-1])
+        df = ibor_model.df(swap.maturity - 0.25) * ois_model.df(swap.maturity) / (ois_model.df(swap.maturity) + fixed_leg_pv - k)
+        ibor_model.add_knot(swap.maturity, df)
+
+    return ois_model, ibor_model
+
+@pytest.mark.parametrize("ois_instruments", [OIS_FUTURES + OIS_SWAPS, OIS_SWAPS])
+def test_bootstrapper_matches_reference(ois_instruments):
+    curves = MultiCurveBootstrapper(ois_instruments, SWAPS_3M).fit()
+    ois_model, ibor_model = reference_bootstrap(ois_instruments, SWAPS_3M)
+
+    assert curves["ois"].curve_model.times == ois_model.times
+    assert curves["ois"].curve_model.dfs == ois_model.dfs
+    assert curves["3m"].curve_model.times == ibor_model.times
+    assert curves["3m"].curve_model.dfs == ibor_model.dfs
+
+@pytest.mark.parametrize("curve, instrument_index, quote", [
+    ("ois", 0, 0.9812),
+    ("ois", 8, 0.0245),
+    ("ois", 10, 0.0285),
+    ("3m", 0, 0.0231),
+    ("3m", 12, 0.0345),
+    ("3m", 20, 0.0425)
+])
+def test_bootstrapper_update_quote(curve, instrument_index, quote):
+    ois_instruments = OIS_FUTURES + OIS_SWAPS
+    bootstrapper = MultiCurveBootstrapper(ois_instruments, SWAPS_3M)
+    bootstrapper.fit()
+    curves = bootstrapper.update_quote(curve, instrument_index, quote)
+
+    bumped_ois = list(ois_instruments)
+    bumped_swaps3m = list(SWAPS_3M)
+    bumped = bumped_ois if curve == "ois" else bumped_swaps3m
+    bumped[instrument_index] = bumped[instrument_index].__class__(bumped[instrument_index].maturity, quote)
+    expected = MultiCurveBootstrapper(bumped_ois, bumped_swaps3m).fit()
+
+    for name in ["ois", "3m"]:
+        assert curves[name].curve_model.times == expected[name].curve_model.times
+        assert curves[name].curve_model.dfs == expected[name].curve_model.dfs
+
+    # market data handed to the bootstrapper is not mutated
+    assert ois_instruments[0].market_price == 0.9810
+    assert SWAPS_3M[0].fixed_rate == 0.0230
+
+def test_bootstrapper_update_quote_skips_unchanged_ois():
+    bootstrapper = MultiCurveBootstrapper(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    curves = bootstrapper.fit()
+    updated = bootstrapper.update_quote("ois", 8, OIS_SWAPS[1].fixed_rate)
+
+    assert updated["3m"] is curves["3m"]
+
+def test_bootstrapper_batch_matches_single_builds():
+    ois_instruments = OIS_FUTURES + OIS_SWAPS
+    instruments = ois_instruments + SWAPS_3M
+    base_quotes = np.array([MultiCurveBootstrapper.quote(instrument) for instrument in instruments])
+    shocks = np.random.default_rng(0).normal(0, 1e-4, (5, len(instruments)))
+    quotes = base_quotes + shocks
+
+    curves = CurveManager().build_batch(ois_instruments, SWAPS_3M, quotes)
+    times = np.linspace(0, 6, 49)
+
+    for scenario, scenario_quotes in enumerate(quotes):
+        shocked = [instrument.__class__(instrument.maturity, quote) for instrument, quote in zip(instruments, scenario_quotes)]
+        expected = CurveManager().build(shocked[:len(ois_instruments)], shocked[len(ois_instruments):])
+
+        for name in ["ois", "3m"]:
+            assert curves[name].df(times)[scenario] == pytest.approx(expected[name].df(times), rel=1e-14)
+            assert curves[name].df(2.1)[scenario] == pytest.approx(expected[name].df(2.1), rel=1e-14)
+
+def test_quote_jacobian():
+    ois_instruments = OIS_FUTURES + OIS_SWAPS
+    bootstrapper = MultiCurveBootstrapper(ois_instruments, SWAPS_3M)
+    curves = bootstrapper.fit()
+    jacobian = bootstrapper.quote_jacobian()
+
+    # central differences of the knot log dfs from a batch of bumped bootstraps
+    quotes = np.array([MultiCurveBootstrapper.quote(instrument) for instrument in ois_instruments + SWAPS_3M])
+    bump = 1e-6
+    bumps = bump * np.eye(len(quotes))
+    bumped = bootstrapper.fit_batch(np.vstack([quotes + bumps, quotes - bumps]))
+
+    for name in ["ois", "3m"]:
+        log_dfs = np.log(np.stack(bumped[name].curve_model.dfs[1:], axis=-1))
+        expected = (log_dfs[:len(quotes)] - log_dfs[len(quotes):]).T / (2 * bump)
+        assert jacobian[name].shape == (len(curves[name].curve_model.times) - 1, len(quotes))
+        assert jacobian[name] == pytest.approx(expected, abs=1e-6)
+
+    # quote risk of a trade maps through the jacobian, a par 3m swap only sees its own quote, by its annuity
+    _, gradients = SWAPS_3M[5].price(curves["ois"], curves["3m"], gradient=True)
+    quote_risk = gradients["ois"] @ jacobian["ois"] + gradients["3m"] @ jacobian["3m"]
+    assert quote_risk[len(ois_instruments) + 5] == pytest.approx(1.5 * np.mean(curves["ois"].df(np.arange(0.25, 1.51, 0.25))), rel=1e-2)
+    assert np.abs(np.delete(quote_risk, len(ois_instruments) + 5)).max() < 1e-8
+
+def test_global_curve_solver_matches_bootstrap():
+    # one instrument per pillar over 120 OIS and 160 3m knots, the global fit reprices exactly like the bootstrap
+    ois_swaps = [OISSwap(maturity, 0.02 + 0.0002 * maturity) for maturity in np.arange(0.5, 60.01, 0.5)]
+    swaps3m = [Swap3M(maturity, 0.025 + 0.0002 * maturity) for maturity in np.arange(0.25, 40.01, 0.25)]
+
+    curve_manager = CurveManager()
+    global_curves = curve_manager.build(ois_swaps, swaps3m, model="log_linear_global")
+    bootstrapped_curves = curve_manager.build(ois_swaps, swaps3m)
+
+    for name in ["ois", "3m"]:
+        assert global_curves[name].curve_model.times == pytest.approx(bootstrapped_curves[name].curve_model.times)
+        assert global_curves[name].curve_model.dfs == pytest.approx(bootstrapped_curves[name].curve_model.dfs, abs=1e-12)
+
+def test_global_curve_solver_overlapping_pillars():
+    # the 1.75y future and the 2y OIS swap both end at 2y, the OIS knots are then a least squares fit
+    ois_instruments = OIS_FUTURES + OIS_SWAPS
+    curve_manager = CurveManager()
+    curves = curve_manager.build(ois_instruments, SWAPS_3M, model="log_linear_global")
+    assert len(curves["ois"].curve_model.times) == len(ois_instruments)
+
+    cashflows = CashflowMatrix(ois_instruments)
+    residuals = cashflows.residuals(curves["ois"])
+    assert cashflows.jacobian(curves["ois"]).T @ residuals == pytest.approx(0, abs=1e-10)
+    assert np.allclose(cashflows.jacobian(curves["ois"], sparse=True).toarray(), cashflows.jacobian(curves["ois"]), rtol=0, atol=1e-14)
+    assert np.abs(residuals).max() < 5e-3
+    for swap in OIS_SWAPS[1:]:
+        assert swap.price(curves["ois"]) == pytest.approx(0, abs=1e-12)
+
+    for swap in SWAPS_3M:
+        assert swap.price(curves["ois"], curves["3m"]) == pytest.approx(0, abs=1e-12)
+
+def test_global_curve_solver_raises_without_convergence():
+    solver = GlobalCurveSolver(OIS_FUTURES + OIS_SWAPS, SWAPS_3M, max_iter=1)
+    with pytest.raises(Exception, match="did not converge"):
+        solver.fit()
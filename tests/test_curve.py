@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from quantfin.curves.curve import Curve
+from quantfin.curves.curve_grid import CurveGrid
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+from examples.data.markets import OIS_FUTURES, OIS_SWAPS, SWAPS_3M
+
+
+def test_vectorised_curve_matches_scalar():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M, model="log_linear_bootstrapped")
+    ns_curve = Curve(NelsonSiegelCurveModel(0.03, -0.01, 0.005, 1.5))
+
+    times = np.linspace(0, 6, 61)
+    for curve in [curves["ois"], curves["3m"], ns_curve]:
+        np.testing.assert_allclose(curve.df(times), [curve.df(t) for t in times], rtol=1e-15)
+        np.testing.assert_allclose(curve.zero_rate(times[1:]), [curve.zero_rate(t) for t in times[1:]], rtol=0, atol=1e-14)
+        np.testing.assert_allclose(curve.forward_rate(times, times + 0.25), [curve.forward_rate(t, t + 0.25) for t in times], rtol=0, atol=1e-14)
+
+def test_nelson_siegel_array_within_an_ulp_of_scalar():
+    curve_model = NelsonSiegelCurveModel(0.03, -0.01, 0.005, 1.5)
+    times = np.linspace(0, 40, 4001)
+    np.testing.assert_array_max_ulp(curve_model.df(times), np.array([curve_model.df(float(t)) for t in times]), maxulp=1)
+
+def test_log_linear_curve_matches_reference():
+    # the original lookup: scan the knots, then raise the bracketing DFs to fractional powers
+    def reference(xs, ys, x):
+        i = 0
+        for i, point in enumerate(xs):
+            if x == point:
+                return ys[i]
+            elif x < point:
+                break
+        return ys[i - 1] ** ((xs[i] - x) / (xs[i] - xs[i - 1])) * ys[i] ** ((x - xs[i - 1]) / (xs[i] - xs[i - 1]))
+
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M, model="log_linear_bootstrapped")
+    times = [0.3, 1.7, 7.9, 12.4, 35.0]
+    for curve in [curves["ois"], curves["3m"]]:
+        xs = [float(x) for x in curve.curve_model.times]
+        ys = [float(y) for y in curve.curve_model.dfs]
+        expected = [reference(xs, ys, t) for t in times]
+        assert [curve.df(t) for t in times] == expected
+        np.testing.assert_allclose(curve.df(np.array(times)), expected, rtol=1e-15)
+
+def test_curve_cache():
+    curve_model = LogLinearBootstrappedCurveModel([0, 1, 2], [1, 0.98, 0.95])
+    curve = Curve(curve_model, cache_size=2)
+
+    assert curve.df(1.5) == curve_model.df(1.5)
+    assert curve.df(1.5 + 1e-12) == curve_model.df(1.5)
+    assert (curve.cache_hits, curve.cache_misses) == (1, 1)
+
+    curve.forward_rate(1, 1.25)
+    curve.df(0.5)
+    # 1.5 was least recently used and got evicted
+    curve.df(1.5)
+    assert (curve.cache_hits, curve.cache_misses) == (1, 4)
+
+    curve_model.add_knot(3, 0.9)
+    assert curve.df(2.5) == curve_model.df(2.5)
+    assert len(curve.cache) == 1
+
+    # arrays are cached per schedule
+    curve = Curve(curve_model, cache_size=10)
+    times = np.array([0.5, 2.5, 2.7])
+    assert np.array_equal(curve.df(times), curve_model.df(times))
+    assert np.array_equal(curve.df(times + 1e-12), curve_model.df(times))
+    assert np.array_equal(curve.df(times[::-1]), curve_model.df(times[::-1]))
+    assert (curve.cache_hits, curve.cache_misses) == (1, 2)
+    assert np.array_equal(curve.forward_rate(times, times + 0.25), curve_model.forward_rate(times, times + 0.25))
+
+    # Nelson-Siegel parameters set in place invalidate the cache too
+    ns_model = NelsonSiegelCurveModel(0.03, -0.01, 0.005, 1.5)
+    curve = Curve(ns_model, cache_size=10)
+    curve.df(times)
+    ns_model.beta0 = 0.04
+    assert np.array_equal(curve.df(times), ns_model.df(times))
+    assert curve.cache_misses == 2
+
+def test_curve_grid():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M, model="log_linear_bootstrapped")
+    ns_model = NelsonSiegelCurveModel(0.03, -0.01, 0.005, 1.5)
+
+    for source in [curves["ois"], curves["3m"].curve_model, ns_model]:
+        grid = CurveGrid(source, t_max=10, tolerance=1e-8)
+        curve_model = grid.curve_model
+        times = np.linspace(0, 12, 241)
+
+        assert grid.max_error <= 1e-8
+        assert np.max(np.abs(grid.df(times) - curve_model.df(times))) <= 1e-8
+        assert grid.df(2.3) == pytest.approx(curve_model.df(2.3), abs=1e-8)
+        assert grid.df(11) == curve_model.df(11)
+
+def test_log_linear_df_gradient():
+    curve_model = LogLinearBootstrappedCurveModel([0, 1, 2, 4], [1, 0.98, 0.95, 0.9])
+    times = np.array([0.5, 1, 1.5, 3, 5])
+    gradient = curve_model.df_gradient(times)
+    assert gradient.shape == (5, 3)
+
+    bump = 1e-7
+    for j in range(3):
+        dfs = list(curve_model.dfs)
+        dfs[j + 1] *= np.exp(bump)
+        bumped = LogLinearBootstrappedCurveModel(curve_model.times, dfs)
+        assert gradient[:, j] == pytest.approx((bumped.df(times) - curve_model.df(times)) / bump, abs=1e-6)
+
+def test_curve_manager_resets_calibration_stats():
+    curve_manager = CurveManager()
+    curve_manager.build(OIS_SWAPS, SWAPS_3M, model="nelson_siegel")
+    assert curve_manager.calibration_stats
+    curve_manager.build(OIS_SWAPS, SWAPS_3M)
+    assert curve_manager.calibration_stats == {}
+
+def test_curve_manager_build_many():
+    snapshots = [
+        (day, OIS_FUTURES + OIS_SWAPS, [swap.__class__(swap.maturity, swap.fixed_rate + 1e-4 * day) for swap in SWAPS_3M])
+        for day in range(7)
+    ]
+    results = list(CurveManager().build_many(iter(snapshots), max_workers=2, chunksize=2))
+
+    assert [date for date, _ in results] == list(range(7))
+    for (date, curves), (_, ois_instruments, swaps3m) in zip(results, snapshots):
+        expected = CurveManager().build(ois_instruments, swaps3m)
+        assert curves["3m"].curve_model.dfs == expected["3m"].curve_model.dfs
+
+def test_curve_manager_build_many_nelson_siegel():
+    snapshots = [
+        (day, OIS_SWAPS, [swap.__class__(swap.maturity, swap.fixed_rate + 1e-4 * day) for swap in SWAPS_3M])
+        for day in range(3)
+    ]
+    results = list(CurveManager().build_many(snapshots, model="nelson_siegel", max_workers=2))
+
+    times = np.array([0.5, 2.0, 7.5])
+    assert [date for date, _ in results] == list(range(3))
+    for (date, curves), (_, ois_instruments, swaps3m) in zip(results, snapshots):
+        expected = CurveManager().build(ois_instruments, swaps3m, model="nelson_siegel")
+        for name in ["ois", "3m"]:
+            assert isinstance(curves[name].curve_model, NelsonSiegelCurveModel)
+            assert np.array_equal(curves[name].df(times), expected[name].df(times))
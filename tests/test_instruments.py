@@ -0,0 +1,128 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from examples.data.markets import CAPLETS_3M, OIS_FUTURES, OIS_SWAPS, SWAPS_3M, SWAPTIONS_3M
+from quantfin.curves.curve import Curve
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.curves.log_linear_bootstrapped_curve_model import LogLinearBootstrappedCurveModel
+from quantfin.instruments.caplet_3m import Caplet3M
+from quantfin.instruments.caplet_3m_asian import Caplet3MAsian
+from quantfin.instruments.ois_swap import OISSwap
+from quantfin.instruments.swap_3m import Swap3M
+from quantfin.instruments.swap_portfolio import SwapPortfolio
+from quantfin.instruments.swaption_3m import Swaption3M
+from quantfin.vol.caplet3m_vol_surface import Caplet3MVolSurface
+from quantfin.vol.swaption3m_vol_surface import Swaption3MVolSurface
+
+
+def bump_knot(curve, knot, bump):
+    dfs = list(curve.curve_model.dfs)
+    dfs[knot + 1] = dfs[knot + 1] * np.exp(bump)
+    return Curve(LogLinearBootstrappedCurveModel(curve.curve_model.times, dfs))
+
+def bump_model(vol_surface, key, param, bump):
+    # replace the models rather than edit them in place, so compiled lookups are rebuilt
+    bumped = copy.copy(vol_surface)
+    bumped.models = dict(vol_surface.models)
+    model = bumped.models[key] = copy.copy(vol_surface.models[key])
+    setattr(model, param, getattr(model, param) + bump)
+    return bumped
+
+def assert_gradient_matches_bumps(price, curves, vol_surface):
+    # price(ois_curve, ibor_curve, vol_surface, gradient) against central differences of every input
+    _, gradient = price(curves["ois"], curves["3m"], vol_surface, True)
+    h = 1e-6
+
+    for name in ["ois", "3m"]:
+        expected = []
+        for knot in range(len(curves[name].curve_model.times) - 1):
+            up, down = dict(curves), dict(curves)
+            up[name], down[name] = bump_knot(curves[name], knot, h), bump_knot(curves[name], knot, -h)
+            expected.append((price(up["ois"], up["3m"], vol_surface, False) - price(down["ois"], down["3m"], vol_surface, False)) / (2 * h))
+        assert gradient[name] == pytest.approx(np.array(expected), rel=1e-6, abs=1e-7)
+
+    for key, d_params in gradient["vol"].items():
+        expected = [
+            (price(curves["ois"], curves["3m"], bump_model(vol_surface, key, param, h), False) -
+             price(curves["ois"], curves["3m"], bump_model(vol_surface, key, param, -h), False)) / (2 * h)
+            for param in ["alpha", "rho", "nu"]
+        ]
+        assert d_params == pytest.approx(np.array(expected), rel=1e-6, abs=1e-7)
+
+def test_caplet_price_gradient():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    vol_surface = Caplet3MVolSurface(CAPLETS_3M, curves["3m"])
+    vol_surface.calibrate()
+
+    # on a slice and interpolated between the 1y and 2y slices
+    for caplet in [Caplet3M(1.0, 0.027, 100), Caplet3M(1.5, 0.03, 100)]:
+        assert_gradient_matches_bumps(caplet.price, curves, vol_surface)
+
+    _, gradient = Caplet3M(1.5, 0.03, 100).price(curves["ois"], curves["3m"], vol_surface, gradient=True)
+    assert set(gradient["vol"]) == {1.0, 2.0}
+
+def test_asian_caplet_price_gradient():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    vol_surface = Caplet3MVolSurface(CAPLETS_3M, curves["3m"])
+    vol_surface.calibrate()
+    caplet = Caplet3MAsian(1.5, 0.028, 100)
+
+    def price(ois_curve, ibor_curve, vol_surface, gradient):
+        # same paths for every bump, so the pathwise gradient matches the differences
+        random.seed(0)
+        return caplet.price(ois_curve, ibor_curve, vol_surface, iterations=50, increment=0.02, gradient=gradient)
+
+    assert_gradient_matches_bumps(price, curves, vol_surface)
+    # the price on the gradient path is the plain Monte Carlo price for the same seed
+    assert price(curves["ois"], curves["3m"], vol_surface, True)[0] == price(curves["ois"], curves["3m"], vol_surface, False)
+
+def test_swaption_price_gradient():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    vol_surface = Swaption3MVolSurface(SWAPTIONS_3M, curves["3m"], curves["ois"])
+    vol_surface.calibrate()
+
+    for swaption in [Swaption3M(1.0, 2.0, 0.026, 100), Swaption3M(1.5, 5.0, 0.028, 100)]:
+        assert_gradient_matches_bumps(swaption.price, curves, vol_surface)
+
+def test_swap_portfolio_matches_trades():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    rng = np.random.default_rng(0)
+    trades = [
+        (Swap3M if rng.random() < 0.5 else OISSwap)(maturity, rate, notional)
+        for maturity, rate, notional in zip(rng.integers(1, 41, 200) * 0.25, rng.uniform(0.01, 0.05, 200), rng.uniform(-100, 100, 200))
+    ]
+    portfolio = SwapPortfolio.from_instruments(trades)
+
+    expected = [trade.price(curves["ois"]) if isinstance(trade, OISSwap) else trade.price(curves["ois"], curves["3m"]) for trade in trades]
+    np.testing.assert_allclose(portfolio.price(curves["ois"], curves["3m"]), expected, rtol=0, atol=1e-12)
+
+def test_swaption_forward_swap_rate_cache():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    vol_surface = Swaption3MVolSurface(SWAPTIONS_3M, curves["3m"], curves["ois"])
+    vol_surface.calibrate()
+
+    # one forward and annuity per (expiry, tenor) slice, computed while calibrating and reused for pricing
+    swap_rate_cache = vol_surface.get_swap_rate_cache()
+    assert set(swap_rate_cache.values) == set(vol_surface.models)
+
+    for swaption in SWAPTIONS_3M[::3]:
+        assert swaption.forward_swap_rate(curves["ois"], curves["3m"], swap_rate_cache) == pytest.approx(swaption.forward_swap_rate(curves["ois"], curves["3m"]), rel=1e-14)
+        assert swaption.price(curves["ois"], curves["3m"], vol_surface, swap_rate_cache=swap_rate_cache) == pytest.approx(swaption.price(curves["ois"], curves["3m"], vol_surface), rel=1e-12)
+
+    other_curves = CurveManager().build(OIS_SWAPS, SWAPS_3M)
+    with pytest.raises(ValueError):
+        SWAPTIONS_3M[0].price(other_curves["ois"], other_curves["3m"], vol_surface, swap_rate_cache=swap_rate_cache)
+
+    swaption = SWAPTIONS_3M[0]
+    price, gradient = swaption.price(curves["ois"], curves["3m"], vol_surface, gradient=True, swap_rate_cache=swap_rate_cache)
+    assert price == pytest.approx(swaption.price(curves["ois"], curves["3m"], vol_surface), rel=1e-12)
+    assert gradient["ois"] == pytest.approx(swaption.price(curves["ois"], curves["3m"], vol_surface, gradient=True)[1]["ois"], rel=1e-10)
+
+    # the cache is built on a quarterly schedule, so a swaption on any other accrual cannot use it
+    semi_annual = Swaption3M(swaption.expiry, swaption.tenor, swaption.strike)
+    semi_annual.accrual = 0.5
+    with pytest.raises(ValueError):
+        semi_annual.price(curves["ois"], curves["3m"], vol_surface, swap_rate_cache=swap_rate_cache)
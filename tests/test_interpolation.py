@@ -1,8 +1,9 @@
 import math
 
+import numpy as np
 import pytest
 
-from quantfin.bootstrap.interpolation import LogLinearInterpolator
+from quantfin.bootstrap.interpolation import Interpolator, LinearInterpolator, LogLinearInterpolator
 
 
 def test_loglinear_interpolator():
@@ -13,3 +14,29 @@ def test_loglinear_interpolator():
 def test_loglinear_extrapolation():
     interpolator = LogLinearInterpolator([1, 2], [1, 2])
     assert interpolator(3) == pytest.approx(4)
+
+def test_loglinear_interpolator_array():
+    interpolator = LogLinearInterpolator([0, 1, 2], [1, 0.98, 0.95])
+    xs = np.array([0, 0.5, 1, 1.5, 2, 3])
+    np.testing.assert_allclose(interpolator(xs), [interpolator(x) for x in xs], rtol=1e-15)
+    assert interpolator(1) == 0.98
+
+def test_linear_interpolator():
+    interpolator = LinearInterpolator([1, 2, 4], [1, 2, 3])
+    assert interpolator(1.5) == pytest.approx(1.5)
+    assert interpolator(3) == pytest.approx(2.5)
+    assert interpolator(5) == pytest.approx(3.5)
+    assert np.allclose(interpolator(np.array([1.5, 3, 5])), [1.5, 2.5, 3.5])
+
+def test_interpolator_append():
+    interpolator = LogLinearInterpolator([0], [1])
+    for x, y in [(1, 0.98), (2, 0.95), (3, 0.93), (5, 0.9)]:
+        interpolator.append(x, y)
+
+    expected = LogLinearInterpolator([0, 1, 2, 3, 5], [1, 0.98, 0.95, 0.93, 0.9])
+    xs = np.array([0.5, 2, 2.5, 4, 6])
+    assert np.array_equal(interpolator(xs), expected(xs))
+    assert interpolator(4.2) == expected(4.2)
+
+    with pytest.raises(NotImplementedError):
+        Interpolator([0, 1], [1, 2])(0.5)
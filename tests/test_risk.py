@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from examples.data.markets import CAPLETS_3M, OIS_FUTURES, OIS_SWAPS, SWAPS_3M
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.instruments.caplet_3m import Caplet3M
+from quantfin.instruments.swap_3m import Swap3M
+from quantfin.risk.dv01_engine import DV01Engine
+from quantfin.vol.caplet3m_vol_surface import Caplet3MVolSurface
+
+
+def test_par_dv01():
+    ois_instruments = OIS_FUTURES + OIS_SWAPS
+    curves = CurveManager().build(ois_instruments, SWAPS_3M)
+    caplet_vol_surface = Caplet3MVolSurface(CAPLETS_3M, curves["3m"])
+    caplet_vol_surface.calibrate()
+    portfolio = [Swap3M(2.0, 0.03, 100), Swap3M(4.5, 0.035, 100), Caplet3M(1.0, 0.026, 100)]
+
+    central = DV01Engine(ois_instruments, SWAPS_3M, max_workers=2).compute(portfolio, caplet_vol_surface)
+    one_sided = DV01Engine(ois_instruments, SWAPS_3M, method="one_sided", max_workers=2).compute(portfolio, caplet_vol_surface)
+
+    assert len(central["buckets"]) == len(ois_instruments) + len(SWAPS_3M)
+    assert central["dv01"].shape == (len(central["buckets"]), len(portfolio))
+    # swaps are near linear in the quotes, the caplet picks up convexity in a one sided bump
+    assert central["dv01"][:, :2] == pytest.approx(one_sided["dv01"][:, :2], abs=1e-4)
+    assert central["dv01"][:, 2] == pytest.approx(one_sided["dv01"][:, 2], abs=1e-3)
+
+    # bumping the 2y 3m par swap quote moves the 2y swap, and nothing depends on quotes past the 4.5y swap
+    bucket = central["buckets"].index(("3m", "Swap3M", 2.0))
+    swaps3m = list(SWAPS_3M)
+    swaps3m[7] = Swap3M(2.0, SWAPS_3M[7].fixed_rate + 1e-4)
+    bumped = CurveManager().build(ois_instruments, swaps3m)
+    expected = portfolio[0].price(bumped["ois"], bumped["3m"]) - portfolio[0].price(curves["ois"], curves["3m"])
+    assert central["dv01"][bucket, 0] == pytest.approx(expected, rel=1e-3)
+    assert np.all(central["dv01"][-1, :2] == 0)
+
+def test_key_rate_dv01():
+    portfolio = [Swap3M(3.0, 0.03, 100)]
+    result = DV01Engine(OIS_SWAPS, SWAPS_3M, max_workers=2).compute(portfolio, mode="key_rate")
+
+    assert result["buckets"][0] == ("ois", "knot", 2.0)
+    assert result["dv01"].shape == (len(OIS_SWAPS) + len(SWAPS_3M), 1)
+    # receiving the float leg, a 3m knot bump at the swap maturity raises the forwards and the PV
+    assert result["dv01"][result["buckets"].index(("3m", "knot", 3.0)), 0] > 0
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+from examples.data.markets import CAPLETS_3M, OIS_FUTURES, OIS_SWAPS, SWAPS_3M
+from quantfin.curves.curve import Curve
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.curves.nelson_siegel_curve_model import NelsonSiegelCurveModel
+from quantfin.snapshot.calibration_cache import CalibrationCache
+from quantfin.snapshot.market_snapshot import load_snapshot, save_snapshot
+from quantfin.vol.caplet3m_vol_surface import Caplet3MVolSurface
+from quantfin.vol.vol_surface import VolSurface
+
+
+def test_snapshot_round_trip(tmp_path):
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    curves["ns"] = Curve(NelsonSiegelCurveModel(0.03, -0.01, 0.005, 1.5))
+    surface = Caplet3MVolSurface(CAPLETS_3M, curves["3m"])
+    surface.calibrate()
+
+    path = tmp_path / "eod.qfs"
+    save_snapshot(path, curves, {"caplets": surface})
+    snapshot = load_snapshot(path)
+
+    times = np.linspace(0, 6, 25)
+    for name, curve in curves.items():
+        assert np.array_equal(snapshot.curves[name].df(times), curve.df(times))
+
+    restored = snapshot.vol_surfaces["caplets"]
+    assert isinstance(restored, Caplet3MVolSurface)
+    for expiry in [0.25, 0.6, 1.0, 3.0]:
+        assert restored.get_vol(expiry, 0.027, 0.026) == surface.get_vol(expiry, 0.027, 0.026)
+
+    # lookups read the mapped arrays in place, models are only built when asked for
+    assert np.shares_memory(snapshot.curves["ois"].curve_model.get_interpolator().xs, snapshot.data)
+    assert np.shares_memory(restored.expiry_index.alpha, snapshot.data)
+    assert restored.slice_models is None
+    assert {key: (model.alpha, model.rho, model.nu) for key, model in restored.models.items()} == {
+        key: (model.alpha, model.rho, model.nu) for key, model in surface.models.items()
+    }
+
+def test_calibration_cache_surface(tmp_path):
+    path = str(tmp_path / "calibration_cache.json")
+
+    def surface(atm_vol_1y):
+        surface = VolSurface()
+        for expiry, atm_vol in [(0.5, 0.2), (1.0, atm_vol_1y), (2.0, 0.22)]:
+            for strike, skew in [(90, 0.04), (95, 0.015), (100, 0.0), (105, 0.005), (110, 0.02)]:
+                surface.add_market_vol(expiry=expiry, strike=strike, vol=atm_vol + skew, forward=100)
+        return surface
+
+    first = surface(0.21)
+    first.calibrate(cache=CalibrationCache(path))
+
+    # a fresh cache read back from disk, only the slice whose quotes moved is refitted
+    cache = CalibrationCache(path)
+    second = surface(0.215)
+    second.calibrate(cache=cache)
+    assert [second.calibration_stats[expiry].get("cached", False) for expiry in [0.5, 1.0, 2.0]] == [True, False, True]
+    assert second.get_vol(0.5, 97, 100) == first.get_vol(0.5, 97, 100)
+    assert cache.hits == 2 and cache.misses == 1
+    assert len(CalibrationCache(path)) == 4
+
+    # a full hit leaves the file alone and no temporary files are left behind
+    modified = os.stat(path).st_mtime_ns
+    cache = CalibrationCache(path)
+    surface(0.215).calibrate(cache=cache)
+    assert cache.hits == 3 and not cache.dirty
+    assert os.stat(path).st_mtime_ns == modified
+    assert os.listdir(tmp_path) == ["calibration_cache.json"]
+
+def test_calibration_cache_merges_concurrent_saves(tmp_path):
+    path = str(tmp_path / "calibration_cache.json")
+    first, second = CalibrationCache(path), CalibrationCache(path)
+    first.put("a", 1)
+    second.put("b", 2)
+    first.save()
+    second.save()
+    assert dict((key, entry["value"]) for key, entry in CalibrationCache(path).entries.items()) == {"a": 1, "b": 2}
+
+    # curve builds leave saving to the caller
+    cache = CalibrationCache(str(tmp_path / "curves.json"))
+    CurveManager().build(OIS_SWAPS, SWAPS_3M, cache=cache)
+    assert cache.dirty and not os.path.exists(cache.path)
+
+def test_calibration_cache_curves_and_eviction():
+    cache = CalibrationCache(max_entries=1)
+    curve_manager = CurveManager()
+    built = curve_manager.build(OIS_SWAPS, SWAPS_3M, model="nelson_siegel", cache=cache)
+    restored = curve_manager.build(OIS_SWAPS, SWAPS_3M, model="nelson_siegel", cache=cache)
+    assert curve_manager.calibration_stats["ois"]["cached"]
+    for name in ["ois", "3m"]:
+        assert restored[name].df(np.array([1.0, 5.0])) == pytest.approx(built[name].df(np.array([1.0, 5.0])), rel=1e-15)
+
+    # a second entry pushes the first out, and expired entries are misses
+    curve_manager.build(OIS_SWAPS, SWAPS_3M, cache=cache)
+    assert len(cache) == 1
+    cache.max_age = -1
+    curve_manager.build(OIS_SWAPS, SWAPS_3M, cache=cache)
+    assert cache.hits == 1 and cache.misses == 3
@@ -1,5 +1,13 @@
+import numpy as np
 import pytest
 
+from examples.data.markets import CAPLETS_3M, OIS_FUTURES, OIS_SWAPS, SWAPS_3M
+from quantfin.curves.curve_manager import CurveManager
+from quantfin.instruments.caplet_3m import Caplet3M
+from quantfin.vol.caplet3m_vol_surface import Caplet3MVolSurface
+from quantfin.vol.swaption3m_vol_cube import Swaption3MVolCube
+from quantfin.vol.vol_calibrator import VolCalibrator
+from quantfin.vol.vol_model import VolModel
 from quantfin.vol.vol_surface import VolSurface
 
 
@@ -9,3 +17,163 @@ def test_vol_surface_add_get():
     surface.calibrate()
     vol = surface.get_vol(expiry=1.0, strike=100, forward=99)
     assert vol == pytest.approx(0.2)
+
+def test_vol_surface_warm_start():
+    surface = VolSurface()
+    for strike, vol in [(90, 0.24), (95, 0.215), (100, 0.2), (105, 0.205), (110, 0.22)]:
+        surface.add_market_vol(expiry=1.0, strike=strike, vol=vol, forward=100)
+    surface.calibrate()
+    cold_stats = surface.calibration_stats[1.0]
+    cold_vol = surface.get_vol(1.0, 97, 100)
+
+    # refitting unchanged quotes starts from the fitted params
+    surface.calibrate(refit_all=True)
+    warm_stats = surface.calibration_stats[1.0]
+
+    assert warm_stats["evaluations"] < cold_stats["evaluations"]
+    assert surface.get_vol(1.0, 97, 100) == pytest.approx(cold_vol, abs=1e-6)
+
+    # an explicit x0 only seeds slices with nothing to warm start from
+    surface.calibrate(x0=[0.5, 0.5, 0.9], refit_all=True)
+    assert surface.calibration_stats[1.0]["evaluations"] == warm_stats["evaluations"]
+
+def test_vol_model_array_matches_scalar():
+    model = VolModel(0.2, -0.3, 0.5)
+    expiries = np.array([0.5, 1.0, 1.0, 2.0, 5.0])
+    strikes = np.array([0.02, 0.025, 0.03, 0.035, 0.03])
+    forwards = np.array([0.025, 0.025, 0.028, 0.03, 0.03])
+
+    vols, gradient = model.get_vol(expiries, strikes, forwards, gradient=True)
+    for i in range(len(expiries)):
+        vol, scalar_gradient = model.get_vol(expiries[i], strikes[i], forwards[i], gradient=True)
+        assert vols[i] == pytest.approx(vol, rel=1e-14)
+        assert vols[i] == pytest.approx(model.get_vol(expiries[i], strikes[i], forwards[i]), rel=1e-14)
+        assert gradient["params"][i] == pytest.approx(scalar_gradient["params"], rel=1e-14)
+        assert gradient["forward"][i] == pytest.approx(scalar_gradient["forward"], rel=1e-14)
+
+    # the ATM quotes agree with the limit of the smile either side
+    assert vols[1] == pytest.approx(model.get_vol(1.0, 0.025 * (1 + 1e-7), 0.025), rel=1e-6)
+    assert vols[4] == pytest.approx(model.get_vol(5.0, 0.03 * (1 - 1e-7), 0.03), rel=1e-6)
+
+def test_vol_calibrator_analytic_jacobian():
+    expiries, strikes, forwards = [1.0] * 5, [0.02, 0.025, 0.03, 0.035, 0.04], [0.03] * 5
+    calibrator = VolCalibrator(expiries, strikes, [0.24, 0.21, 0.2, 0.205, 0.22], forwards)
+    args = (expiries, strikes, forwards, calibrator.market_vols)
+    params = np.array([0.2, -0.3, 0.5])
+
+    analytic = calibrator.jacobian(params, *args)
+    bump = 1e-7
+    finite_difference = np.array([
+        (calibrator.residuals(params + bump * e, *args) - calibrator.residuals(params - bump * e, *args)) / (2 * bump)
+        for e in np.eye(3)
+    ]).T
+    assert analytic == pytest.approx(finite_difference, rel=1e-6, abs=1e-9)
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_vol_surface_parallel_calibration(executor):
+    surface = VolSurface()
+    for expiry in [0.5, 1.0, 2.0]:
+        for strike, vol in [(90, 0.24), (95, 0.215), (100, 0.2), (105, 0.205), (110, 0.22)]:
+            surface.add_market_vol(expiry=expiry, strike=strike, vol=vol + 0.01 * expiry, forward=100)
+    # a slice whose residuals are not finite fails on its own
+    surface.add_market_vol(expiry=3.0, strike=100, vol=0.2, forward=-100)
+
+    serial = VolSurface(list(surface.expiries), list(surface.strikes), list(surface.vols), list(surface.forwards))
+    serial.calibrate()
+    surface.calibrate(executor=executor, max_workers=2)
+
+    assert list(surface.models) == [0.5, 1.0, 2.0]
+    assert list(surface.failed_slices) == [3.0]
+    for expiry in [0.5, 1.0, 2.0]:
+        assert surface.get_vol(expiry, 97, 100) == serial.get_vol(expiry, 97, 100)
+        assert surface.calibration_stats[expiry] == serial.calibration_stats[expiry]
+
+def test_vol_surface_array_queries():
+    surface = VolSurface()
+    for expiry in [0.5, 1.0, 2.0]:
+        for strike, vol in [(90, 0.24), (95, 0.215), (100, 0.2), (105, 0.205), (110, 0.22)]:
+            surface.add_market_vol(expiry=expiry, strike=strike, vol=vol + 0.01 * expiry, forward=100)
+    surface.calibrate()
+
+    expiries = np.array([0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0])
+    strikes = np.array([92, 100, 97, 105, 100, 108, 95])
+    vols = surface.get_vol(expiries, strikes, 100.0)
+    for expiry, strike, vol in zip(expiries, strikes, vols):
+        assert surface.get_vol(expiry, strike, 100) == pytest.approx(vol, rel=1e-14)
+
+    left, right = surface.models[1.0].get_vol(1.0, 100, 100), surface.models[2.0].get_vol(2.0, 100, 100)
+    assert vols[4] == pytest.approx((left + right) / 2, rel=1e-14)
+    # flat beyond the first and last slices
+    assert vols[0] == pytest.approx(surface.models[0.5].get_vol(0.5, 92, 100), rel=1e-14)
+    assert vols[6] == pytest.approx(surface.models[2.0].get_vol(2.0, 95, 100), rel=1e-14)
+
+    single = VolSurface()
+    single.add_market_vol(expiry=1.0, strike=100, vol=0.2, forward=99)
+    single.calibrate()
+    assert single.get_vol(np.array([0.5, 1.0, 2.0]), 100, 99) == pytest.approx(0.2)
+    assert single.get_vol(0.5, 100, 99) == single.get_vol(2.0, 100, 99) == pytest.approx(0.2)
+
+@pytest.mark.parametrize("interpolation", ["vol", "params"])
+def test_swaption_vol_cube(interpolation):
+    models = {
+        (1.0, 2.0): VolModel(0.2, -0.2, 0.4), (1.0, 5.0): VolModel(0.18, -0.3, 0.5),
+        (2.0, 2.0): VolModel(0.22, -0.1, 0.45), (2.0, 5.0): VolModel(0.19, -0.25, 0.35),
+        (5.0, 5.0): VolModel(0.21, -0.15, 0.3)
+    }
+    cube = Swaption3MVolCube(models, interpolation)
+    expiries, tenors = np.array([1.0, 1.5, 1.5, 2.0, 0.5, 3.0]), np.array([2.0, 3.0, 5.0, 4.0, 2.0, 5.0])
+    strikes, forwards = np.array([0.025, 0.03, 0.028, 0.03, 0.024, 0.031]), np.array([0.026, 0.028, 0.028, 0.029, 0.025, 0.03])
+
+    vols, gradient = cube.get_vol(expiries, tenors, strikes, forwards, gradient=True)
+    for n in range(len(expiries)):
+        vol, scalar_gradient = cube.get_vol(expiries[n], tenors[n], strikes[n], forwards[n], gradient=True)
+        assert vols[n] == pytest.approx(vol, rel=1e-14)
+        assert cube.get_vol(expiries[n], tenors[n], strikes[n], forwards[n]) == pytest.approx(vol, rel=1e-14)
+        for key, d_params in scalar_gradient["sabr"].items():
+            assert gradient["sabr"][key][n] == pytest.approx(d_params, rel=1e-14)
+
+    if interpolation == "vol":
+        # bilinear in the corner vols, each corner evaluated at its own expiry
+        corners = [models[key].get_vol(key[0], 0.03, 0.028) for key in [(1.0, 2.0), (1.0, 5.0), (2.0, 2.0), (2.0, 5.0)]]
+        assert vols[1] == pytest.approx(0.5 * (2 * corners[0] / 3 + corners[1] / 3) + 0.5 * (2 * corners[2] / 3 + corners[3] / 3), rel=1e-14)
+    else:
+        blended = VolModel(0.5 * 0.18 + 0.5 * 0.19, 0.5 * -0.3 + 0.5 * -0.25, 0.5 * 0.5 + 0.5 * 0.35)
+        assert vols[2] == pytest.approx(blended.get_vol(1.5, 0.028, 0.028), rel=1e-14)
+
+    # vols are held flat off the grid
+    assert vols[4] == pytest.approx(models[(1.0, 2.0)].get_vol(1.0, 0.024, 0.025), rel=1e-14)
+    # (5.0, 2.0) has no calibrated model
+    with pytest.raises(KeyError):
+        cube.get_vol(4.0, 3.0, 0.03, 0.03)
+
+def test_caplet_surface_refits_dirty_slices():
+    curves = CurveManager().build(OIS_FUTURES + OIS_SWAPS, SWAPS_3M)
+    surface = Caplet3MVolSurface(list(CAPLETS_3M), curves["3m"])
+    surface.calibrate()
+    models = dict(surface.models)
+
+    # a live update replaces the 1y ATM quote in place and only that slice is refitted
+    surface.update_caplet(Caplet3M(1.0, 0.0260, 0.25, 0.175))
+    assert len(surface.caplets) == len(CAPLETS_3M)
+    assert surface.dirty_slices == {1.0}
+    surface.calibrate()
+    assert surface.models[1.0] is not models[1.0]
+    assert all(surface.models[expiry] is models[expiry] for expiry in [0.25, 2.0, 5.0])
+    assert surface.dirty_slices == set()
+
+    # a new expiry is fitted on its own, a new engine refits everything
+    surface.add_caplet(Caplet3M(3.0, 0.034, 0.25, 0.23))
+    surface.add_caplet(Caplet3M(3.0, 0.036, 0.25, 0.22))
+    surface.add_caplet(Caplet3M(3.0, 0.038, 0.25, 0.225))
+    models = dict(surface.models)
+    surface.calibrate()
+    assert 3.0 in surface.models and surface.models[2.0] is models[2.0]
+    surface.calibrate(engine="levenberg_marquardt")
+    assert surface.models[2.0] is not models[2.0]
+
+    # knots added to the curve in place move the forwards, so every slice is refitted
+    models = dict(surface.models)
+    surface.ibor_curve.curve_model.add_knot(60.0, 0.2)
+    surface.calibrate(engine="levenberg_marquardt")
+    assert all(surface.models[expiry] is not models[expiry] for expiry in [0.25, 1.0, 2.0])